@@ -0,0 +1,104 @@
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+import re
+from flask import current_app, request, send_from_directory, url_for
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+logger = logging.getLogger(__name__)
+
+# Static assets are built once (Docker image build or `flask assets build`)
+# into static/dist: minified, named by content hash and stored alongside
+# .gz/.br copies, with manifest.json mapping source paths to built ones.
+# Built files never change, so they are served with immutable cache headers,
+# and the precompressed copy is picked per request without compressing anything.
+
+ASSET_SOURCES = ['css/tailwind.css', 'js/main.js', 'js/admin.js']
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'manifest.json'
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def minify_css(text):
+    text = re.sub(r'/\*.*?\*/', '', text, flags=re.S)
+    text = re.sub(r'\s+', ' ', text)
+    return re.sub(r'\s*([{};])\s*', r'\1', text).replace(';}', '}').strip()
+
+def minify_js(text):
+    # Conservative: drops indentation, blank lines and whole-line comments only
+    lines = []
+    for line in text.splitlines():
+        stripped = line.strip()
+        if stripped and not stripped.startswith('//'):
+            lines.append(stripped)
+    return '\n'.join(lines) + '\n'
+
+def build_assets(static_folder, sources=ASSET_SOURCES):
+    dist = os.path.join(static_folder, DIST_DIR)
+    manifest = {}
+    for source in sources:
+        with open(os.path.join(static_folder, source), 'r', encoding='utf-8') as f:
+            text = f.read()
+        data = (minify_css(text) if source.endswith('.css') else minify_js(text)).encode()
+
+        stem, ext = os.path.splitext(source)
+        built = f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+        path = os.path.join(static_folder, built)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        with open(path + '.gz', 'wb') as f:
+            f.write(gzip.compress(data, compresslevel=9, mtime=0))
+        if brotli is not None:
+            with open(path + '.br', 'wb') as f:
+                f.write(brotli.compress(data, quality=11))
+        manifest[source] = built
+        logger.info(f"Built {source} -> {built} ({len(text)} -> {len(data)} bytes)")
+
+    if brotli is None:
+        logger.warning("brotli is not installed; only gzip copies were written")
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_folder):
+    try:
+        with open(os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        # Unbuilt checkout: serve the sources as they are
+        return {}
+
+def asset_url(source):
+    return url_for('static', filename=current_app.extensions['asset_manifest'].get(source, source))
+
+def _serve_static(filename):
+    if not filename.startswith(DIST_DIR + '/'):
+        return current_app.send_static_file(filename)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    accepted = request.accept_encodings
+    folder = current_app.static_folder
+    served, encoding = filename, None
+    for candidate, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if accepted[candidate] and os.path.isfile(os.path.join(folder, filename + suffix)):
+            served, encoding = filename + suffix, candidate
+            break
+
+    response = send_from_directory(folder, served, mimetype=mimetype, max_age=IMMUTABLE_MAX_AGE)
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return response
+
+def init_assets(app):
+    app.extensions['asset_manifest'] = load_manifest(app.static_folder)
+    app.jinja_env.globals['asset_url'] = asset_url
+    app.view_functions['static'] = _serve_static
@@ -1,8 +1,118 @@
-from flask_login import LoginManager
-from models import User
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict, deque
+from flask import current_app, request
+from flask_login import LoginManager, UserMixin
+from models import db, User, ApiToken
 
 login_manager = LoginManager()
 
+TOKEN_PREFIX = 'tsm'
+
+class SessionUser(UserMixin):
+    # Detached snapshot of a User, safe to share between requests and threads
+    def __init__(self, user_id, username):
+        self.id = user_id
+        self.username = username
+
+class TTLCache:
+    # Small LRU with per-entry expiry; misses return None
+    def __init__(self):
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value, ttl, max_size):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_size:
+                self._entries.popitem(last=False)
+
+# Only the id and username are cached, and neither changes after creation. API
+# tokens are not cached: a revocation from the CLI must hold in every worker at once.
+_users = TTLCache()
+
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    user_id = int(user_id)
+    user = _users.get(user_id)
+    if user is None:
+        row = db.session.query(User.id, User.username).filter(User.id == user_id).first()
+        if row is None:
+            return None
+        user = SessionUser(row.id, row.username)
+        config = current_app.config
+        _users.put(user_id, user, config['USER_CACHE_SECONDS'], config['USER_CACHE_SIZE'])
+    return user
+
+def _token_digest(secret):
+    key = current_app.config['API_TOKEN_KEY'].encode()
+    return hmac.new(key, secret.encode(), hashlib.sha256).hexdigest()
+
+def issue_api_token(user, name):
+    # Returns the token string; only its digest is stored
+    secret = secrets.token_urlsafe(32)
+    token = ApiToken(user_id=user.id, name=name, digest=_token_digest(secret))
+    db.session.add(token)
+    db.session.commit()
+    return f'{TOKEN_PREFIX}_{token.id}_{secret}'
+
+def revoke_api_token(token_id):
+    deleted = ApiToken.query.filter(ApiToken.id == token_id).delete()
+    db.session.commit()
+    return bool(deleted)
+
+@login_manager.request_loader
+def load_user_from_token(req):
+    # Automation clients send "Authorization: Bearer tsm_<id>_<secret>"
+    header = req.headers.get('Authorization', '')
+    if not header.startswith('Bearer '):
+        return None
+    prefix, _, rest = header[7:].strip().partition('_')
+    token_id, _, secret = rest.partition('_')
+    if prefix != TOKEN_PREFIX or not token_id.isdigit() or not secret:
+        return None
+    # One primary-key read per request, so a revoked token stops working immediately
+    row = db.session.query(ApiToken.digest, User.id, User.username) \
+        .join(User, User.id == ApiToken.user_id) \
+        .filter(ApiToken.id == int(token_id)) \
+        .first()
+    if row is None or not hmac.compare_digest(row.digest, _token_digest(secret)):
+        return None
+    return SessionUser(row.id, row.username)
+
+# Sliding one-minute window of login attempts per client IP
+_login_attempts = {}
+_login_lock = threading.Lock()
+
+def login_throttled():
+    # Counts this attempt; returns seconds to wait if the IP is over its limit, else 0
+    limit = current_app.config['LOGIN_ATTEMPTS_PER_MINUTE']
+    now = time.monotonic()
+    address = request.remote_addr or 'unknown'
+    with _login_lock:
+        if len(_login_attempts) > 10000:
+            # Forget idle clients so the table can't grow without bound
+            for key in [key for key, attempts in _login_attempts.items() if attempts[-1] < now - 60]:
+                del _login_attempts[key]
+        attempts = _login_attempts.setdefault(address, deque())
+        while attempts and attempts[0] < now - 60:
+            attempts.popleft()
+        if len(attempts) >= limit:
+            return int(attempts[0] + 60 - now) + 1
+        attempts.append(now)
+    return 0
@@ -0,0 +1,232 @@
+"""Load-test the roster API and the rotation engine against a synthetic org.
+
+Seeds TEAMS x MEMBERS into a scratch database (a temporary SQLite file by
+default, or any SQLAlchemy URL such as a local Postgres), drives the app
+in-process through the Flask test client and writes throughput and p50/p99
+latency per scenario to JSON. The target database is dropped and recreated.
+
+Usage: python benchmarks/bench_api.py [--teams N] [--members N] [--requests N] [--page-size N]
+                                      [--database-url URL] [--output PATH] [--compare PATH]
+"""
+import argparse
+import json
+import logging
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import insert, update, func  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from config import Config  # noqa: E402
+from main import create_app  # noqa: E402
+from models import db, User, Team, Member, RotationState  # noqa: E402
+from roster import bump_roster_version  # noqa: E402
+from utils import check_rotations, db_now  # noqa: E402
+
+SCHEDULE = '0 9 * * 1'
+PASSWORD = 'bench'
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+def summarize(timings):
+    ordered = sorted(timings)
+    total = sum(ordered)
+    return {
+        'runs': len(ordered),
+        'total_s': round(total, 4),
+        'throughput_per_s': round(len(ordered) / total, 1) if total else None,
+        'p50_ms': round(percentile(ordered, 0.50) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 0.99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3)
+    }
+
+def seed(app, teams, members):
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        user = User(username='bench')
+        user.set_password(PASSWORD)
+        db.session.add(user)
+        db.session.execute(insert(Team), [{'name': f'team-{index:06d}', 'rotation_schedule': SCHEDULE}
+                                          for index in range(teams)])
+        team_ids = [team_id for (team_id,) in db.session.query(Team.id).order_by(Team.id)]
+        db.session.execute(insert(Member), [{'name': f'member-{team_id}-{position}', 'team_id': team_id,
+                                             'position': position}
+                                            for team_id in team_ids for position in range(1, members + 1)])
+        due = db_now() - timedelta(minutes=1)
+        db.session.execute(insert(RotationState), [{'team_id': team_id, 'schedule': SCHEDULE,
+                                                    'next_rotation': due} for team_id in team_ids])
+        db.session.commit()
+        return team_ids
+
+def timed_requests(count, request):
+    timings = []
+    for index in range(count):
+        started = time.perf_counter()
+        response = request(index)
+        timings.append(time.perf_counter() - started)
+        if response.status_code >= 400:
+            raise RuntimeError(f"Request failed with {response.status_code}: {response.get_data(as_text=True)[:200]}")
+    return summarize(timings)
+
+def run(args):
+    logging.disable(logging.WARNING)
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.NamedTemporaryFile(suffix='.db', delete=False)
+        scratch.close()
+        database_url = f'sqlite:///{scratch.name}'
+
+    class BenchConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SCHEDULER_ENABLED = False
+        SCHEDULER_JOBSTORE = 'memory'
+
+    try:
+        app = create_app(BenchConfig)
+        started = time.perf_counter()
+        team_ids = seed(app, args.teams, args.members)
+        seed_seconds = time.perf_counter() - started
+
+        rng = random.Random(args.seed)
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': PASSWORD})
+        results = {}
+
+        def uncached_teams(index):
+            # Every request rebuilds the body, as after any roster change
+            with app.app_context():
+                bump_roster_version()
+                db.session.commit()
+            return client.get('/api/teams')
+
+        results['get_teams'] = timed_requests(args.heavy_requests, uncached_teams)
+        results['get_teams_cached'] = timed_requests(args.requests, lambda index: client.get('/api/teams'))
+
+        def uncached_page(index):
+            with app.app_context():
+                bump_roster_version()
+                db.session.commit()
+            return client.get('/api/teams', query_string={'limit': args.page_size, 'fields': 'id,name'})
+
+        results['get_teams_page'] = timed_requests(args.requests, uncached_page)
+
+        # Walk every page the way the admin UI does; keyset pages cost the same at any depth
+        page_timings, cursor = [], None
+        while True:
+            query = {'limit': args.page_size, 'fields': 'id,name'}
+            if cursor:
+                query['cursor'] = cursor
+            started = time.perf_counter()
+            page = client.get('/api/teams', query_string=query).get_json()
+            page_timings.append(time.perf_counter() - started)
+            cursor = page['next_cursor']
+            if not cursor:
+                break
+        results['walk_team_pages'] = summarize(page_timings)
+        results['get_team_members'] = timed_requests(
+            args.requests, lambda index: client.get(f'/api/teams/{rng.choice(team_ids)}/members'))
+
+        reorder_teams = [rng.choice(team_ids) for _ in range(args.requests)]
+        with app.app_context():
+            orders = {team_id: [member_id for (member_id,) in db.session.query(Member.id)
+                                .filter(Member.team_id == team_id).order_by(Member.position)]
+                      for team_id in set(reorder_teams)}
+
+        def reorder(index):
+            team_id = reorder_teams[index]
+            orders[team_id].reverse()
+            return client.put(f'/api/teams/{team_id}/members/reorder', json={'order': orders[team_id]})
+
+        results['reorder_members'] = timed_requests(args.requests, reorder)
+
+        # One removal per team, so every request hits a full-size team
+        remove_teams = rng.sample(team_ids, min(args.requests, len(team_ids)))
+        with app.app_context():
+            victims = dict(db.session.query(Member.team_id, func.min(Member.id))
+                           .filter(Member.team_id.in_(remove_teams)).group_by(Member.team_id))
+        results['remove_member'] = timed_requests(
+            len(remove_teams),
+            lambda index: client.post(f'/api/teams/{remove_teams[index]}/members/{victims[remove_teams[index]]}/remove'))
+
+        sweeps = []
+        for _ in range(args.sweeps):
+            with app.app_context():
+                db.session.execute(update(RotationState).values(
+                    next_rotation=db_now() - timedelta(minutes=1)))
+                db.session.commit()
+            started = time.perf_counter()
+            check_rotations(app)
+            sweeps.append(time.perf_counter() - started)
+        results['check_rotations_sweep'] = dict(summarize(sweeps), teams=len(team_ids))
+
+        return {
+            'commit': _git_commit(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'database': make_url(database_url).get_backend_name(),
+            'teams': args.teams,
+            'members_per_team': args.members,
+            'seed_s': round(seed_seconds, 3),
+            'results': results
+        }
+    finally:
+        if scratch is not None:
+            os.unlink(scratch.name)
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def print_report(report, baseline=None):
+    print(f"{report['teams']} teams x {report['members_per_team']} members on {report['database']} "
+          f"(seeded in {report['seed_s']} s)")
+    for name, result in report['results'].items():
+        line = (f"  {name:24} {result['runs']:6} runs  {result['throughput_per_s'] or 0:9.1f}/s  "
+                f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms")
+        previous = (baseline or {}).get('results', {}).get(name)
+        if previous and previous['p50_ms']:
+            line += f"  p50 {100 * (result['p50_ms'] / previous['p50_ms'] - 1):+.1f}% vs {baseline.get('commit')}"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=10000)
+    parser.add_argument('--members', type=int, default=5)
+    parser.add_argument('--requests', type=int, default=500, help='Requests per light scenario')
+    parser.add_argument('--heavy-requests', type=int, default=20, help='Uncached GET /api/teams requests')
+    parser.add_argument('--page-size', type=int, default=100, help='Teams per page in the paged scenarios')
+    parser.add_argument('--sweeps', type=int, default=3, help='Full check_rotations sweeps')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--database-url', help='SQLAlchemy URL of a scratch database (it is wiped)')
+    parser.add_argument('--output', default='bench_api.json')
+    parser.add_argument('--compare', help='Earlier results file to compare against')
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
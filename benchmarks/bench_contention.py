@@ -0,0 +1,169 @@
+"""Run rotation sweeps, admin writes and roster reads against one database at once.
+
+Seeds a synthetic org into a scratch database, then for DURATION seconds runs
+a scheduler thread doing check_rotations sweeps, WRITERS threads doing
+reorders and member add/remove, and READERS threads fetching members. Reports
+per-operation throughput, p50/p99 latency and errors such as "database is
+locked". --stock-sqlite turns off the WAL/synchronous/busy_timeout profile to
+compare against SQLite defaults. The target database is dropped and recreated.
+
+Usage: python benchmarks/bench_contention.py [--duration S] [--writers N] [--readers N]
+                                             [--teams N] [--database-url URL] [--stock-sqlite]
+"""
+import argparse
+import collections
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from sqlalchemy import update  # noqa: E402
+from sqlalchemy.engine import make_url  # noqa: E402
+from bench_api import seed, summarize, PASSWORD  # noqa: E402
+from config import Config  # noqa: E402
+from main import create_app  # noqa: E402
+from models import db, Member, RotationState  # noqa: E402
+from utils import check_rotations, db_now  # noqa: E402
+
+def run(args):
+    logging.disable(logging.CRITICAL)
+    scratch = None
+    database_url = args.database_url
+    if not database_url:
+        scratch = tempfile.mkdtemp()
+        database_url = f"sqlite:///{os.path.join(scratch, 'contention.db')}"
+
+    class ContentionConfig(Config):
+        SQLALCHEMY_DATABASE_URI = database_url
+        SCHEDULER_ENABLED = False
+        SCHEDULER_JOBSTORE = 'memory'
+        LOGIN_ATTEMPTS_PER_MINUTE = 1000
+        if args.stock_sqlite:
+            SQLITE_JOURNAL_MODE = 'DELETE'
+            SQLITE_SYNCHRONOUS = 'FULL'
+            SQLITE_BUSY_TIMEOUT_MS = 0
+            SQLITE_READ_ONLY_BIND = False
+
+    app = create_app(ContentionConfig)
+    team_ids = seed(app, args.teams, args.members)
+    timings = collections.defaultdict(list)
+    errors = collections.Counter()
+    deadline = time.monotonic() + args.duration
+
+    def record(name, started, ok, detail=''):
+        timings[name].append(time.perf_counter() - started)
+        if not ok:
+            errors[f"{name}: {' '.join(detail.split())[:80]}"] += 1
+
+    def scheduler_loop():
+        while time.monotonic() < deadline:
+            try:
+                with app.app_context():
+                    db.session.execute(update(RotationState).values(next_rotation=db_now() - timedelta(minutes=1)))
+                    db.session.commit()
+            except Exception as e:
+                errors[f"reset: {' '.join(str(e).split())[:80]}"] += 1
+                continue
+            started = time.perf_counter()
+            try:
+                check_rotations(app)
+                record('check_rotations', started, True)
+            except Exception as e:
+                record('check_rotations', started, False, str(e))
+            time.sleep(args.sweep_interval)
+
+    def writer_loop(seed_value):
+        rng = random.Random(seed_value)
+        client = app.test_client()
+        client.post('/login', data={'username': 'bench', 'password': PASSWORD})
+        while time.monotonic() < deadline:
+            team_id = rng.choice(team_ids)
+            with app.app_context():
+                order = [member_id for (member_id,) in db.session.query(Member.id).filter(Member.team_id == team_id)]
+            action = rng.choice(['reorder', 'add', 'remove']) if order else 'add'
+            started = time.perf_counter()
+            if action == 'reorder':
+                rng.shuffle(order)
+                response = client.put(f'/api/teams/{team_id}/members/reorder', json={'order': order})
+            elif action == 'add':
+                response = client.post(f'/api/teams/{team_id}/members', json={'name': 'added'})
+            else:
+                response = client.post(f'/api/teams/{team_id}/members/{rng.choice(order)}/remove')
+            record(action, started, response.status_code < 400,
+                   f'{response.status_code} {response.get_data(as_text=True)}')
+
+    def reader_loop(seed_value):
+        rng = random.Random(seed_value)
+        client = app.test_client()
+        while time.monotonic() < deadline:
+            started = time.perf_counter()
+            response = client.get(f'/api/teams/{rng.choice(team_ids)}/members')
+            record('get_members', started, response.status_code < 400, str(response.status_code))
+
+    threads = [threading.Thread(target=scheduler_loop)]
+    threads += [threading.Thread(target=writer_loop, args=(index,)) for index in range(args.writers)]
+    threads += [threading.Thread(target=reader_loop, args=(1000 + index,)) for index in range(args.readers)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        if scratch is not None:
+            with app.app_context():
+                db.engine.dispose()
+            for name in os.listdir(scratch):
+                os.unlink(os.path.join(scratch, name))
+            os.rmdir(scratch)
+
+    results = {}
+    for name, values in sorted(timings.items()):
+        result = summarize(values)
+        result['throughput_per_s'] = round(len(values) / args.duration, 1)
+        results[name] = result
+    return {
+        'database': make_url(database_url).get_backend_name(),
+        'profile': 'stock' if args.stock_sqlite else 'tuned',
+        'duration_s': args.duration,
+        'writers': args.writers,
+        'readers': args.readers,
+        'teams': args.teams,
+        'results': results,
+        'errors': dict(errors.most_common())
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--duration', type=float, default=20)
+    parser.add_argument('--writers', type=int, default=4)
+    parser.add_argument('--readers', type=int, default=4)
+    parser.add_argument('--teams', type=int, default=2000)
+    parser.add_argument('--members', type=int, default=5)
+    parser.add_argument('--sweep-interval', type=float, default=0.5, help='Pause between rotation sweeps')
+    parser.add_argument('--database-url', help='SQLAlchemy URL of a scratch database (it is wiped)')
+    parser.add_argument('--stock-sqlite', action='store_true', help='Use SQLite defaults instead of the profile')
+    parser.add_argument('--output', default='bench_contention.json')
+    args = parser.parse_args()
+
+    report = run(args)
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"{report['profile']} {report['database']}: {args.writers} writers, {args.readers} readers, "
+          f"{args.teams} teams, {args.duration:.0f} s")
+    for name, result in report['results'].items():
+        print(f"  {name:16} {result['runs']:6} ops  {result['throughput_per_s']:8.1f}/s  "
+              f"p50 {result['p50_ms']:9.3f} ms  p99 {result['p99_ms']:9.3f} ms")
+    for error, count in report['errors'].items():
+        print(f"  error x{count}: {error}")
+    print(f"Results written to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""Compare compiled schedules against building a croniter on every call.
+
+Usage: python benchmarks/bench_schedule.py [--iterations N]
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from croniter import croniter
+from schedule import compile_schedule
+
+SCHEDULES = ['0 9 * * 1', '0 9 */2 * *', '*/15 8-17 * * 1-5', '0 0 1 * *']
+
+def per_call_croniter(expression, base):
+    return croniter(expression, base).get_next(datetime)
+
+def compiled(expression, base):
+    return compile_schedule(expression).next_after(base)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=20000)
+    args = parser.parse_args()
+
+    bases = [datetime(2025, 1, 1) + timedelta(minutes=37 * i) for i in range(256)]
+    for expression in SCHEDULES:
+        results = {}
+        for name, fn in (('croniter per call', per_call_croniter), ('compiled', compiled)):
+            counter = iter(range(args.iterations))
+            elapsed = timeit.timeit(
+                lambda: fn(expression, bases[next(counter) % len(bases)]),
+                number=args.iterations
+            )
+            results[name] = elapsed / args.iterations * 1e6
+        speedup = results['croniter per call'] / results['compiled']
+        print(f"{expression:<20} " + '  '.join(f"{name}: {us:7.2f} us" for name, us in results.items())
+              + f"  speedup: {speedup:5.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,40 @@
+"""Measure cold start of the WSGI app (import + create_app) in fresh interpreters.
+
+Usage: python benchmarks/bench_startup.py [--runs N] [--budget SECONDS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PROBE = (
+    "import time; start = time.perf_counter(); "
+    "from main import create_app; create_app(); "
+    "print(time.perf_counter() - start)"
+)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--budget', type=float, default=1.0, help='Fail if the median exceeds this many seconds')
+    args = parser.parse_args()
+
+    env = dict(os.environ, SCHEDULER_ENABLED='0')
+    timings = []
+    for _ in range(args.runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=ROOT, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+
+    median = statistics.median(timings)
+    print(f"create_app cold start: median {median * 1000:.1f} ms, "
+          f"min {min(timings) * 1000:.1f} ms, max {max(timings) * 1000:.1f} ms over {args.runs} runs")
+    if median > args.budget:
+        print(f"Median exceeds budget of {args.budget:.2f} s")
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Compare next-rotation math across many timezones: pytz, zoneinfo and zone tables.
+
+Computes the next rotation (as a naive UTC instant) for TEAMS teams spread over
+ZONES timezones three ways: pytz localize per team (the previous approach),
+zoneinfo conversions per team, and the cached per-zone transition tables used
+by the app. Results are checked against each other so a speedup can't hide a
+DST mistake. Expected mismatches: the plain zoneinfo loop fires a second time
+when the scheduled time falls in a repeated (fall-back) hour, and pytz bundles
+its own tz database, which may be a different release than the system one.
+
+Usage: python benchmarks/bench_timezones.py [--teams N] [--zones N] [--rounds N]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytz
+from schedule import compile_schedule
+from timezones import load_zone, zone_table
+
+SCHEDULES = ['0 9 * * 1', '30 2 */2 * *', '*/15 8-17 * * 1-5', '0 0 1 * *', '30 2 * * *']
+
+def with_pytz(compiled, zone, after):
+    tz = pytz.timezone(zone)
+    local = pytz.utc.localize(after).astimezone(tz).replace(tzinfo=None)
+    while True:
+        local = compiled.next_after(local)
+        try:
+            instant = tz.localize(local, is_dst=None)
+        except pytz.NonExistentTimeError:
+            instant = tz.normalize(tz.localize(local, is_dst=False))
+        except pytz.AmbiguousTimeError:
+            instant = tz.localize(local, is_dst=True)
+        instant = instant.astimezone(pytz.utc).replace(tzinfo=None)
+        if instant > after:
+            return instant
+
+def with_zoneinfo(compiled, zone, after):
+    tz = load_zone(zone)
+    local = after.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None)
+    while True:
+        local = compiled.next_after(local)
+        instant = local.replace(tzinfo=tz).astimezone(timezone.utc).replace(tzinfo=None)
+        if instant > after:
+            return instant
+
+def with_tables(compiled, zone, after):
+    return compiled.next_utc(zone_table(zone), after)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--teams', type=int, default=5000)
+    parser.add_argument('--zones', type=int, default=100)
+    parser.add_argument('--rounds', type=int, default=3, help='Timed passes over all teams')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    zones = rng.sample(pytz.common_timezones, min(args.zones, len(pytz.common_timezones)))
+    # Instants around the 2026 DST changes on both hemispheres, plus arbitrary ones
+    starts = [datetime(2026, 3, 29, 0, 45), datetime(2026, 10, 25, 0, 15), datetime(2026, 4, 5, 15, 30),
+              datetime(2026, 11, 1, 5, 30), datetime(2026, 7, 1, 12, 0)]
+    teams = [(compile_schedule(rng.choice(SCHEDULES)), rng.choice(zones),
+              rng.choice(starts) + timedelta(minutes=rng.randrange(-180, 180)))
+             for _ in range(args.teams)]
+
+    started = time.perf_counter()
+    for zone in zones:
+        zone_table(zone).offset_at(datetime(2026, 1, 1))
+    build_ms = (time.perf_counter() - started) * 1000
+
+    results = {}
+    timings = {}
+    for name, fn in (('pytz localize', with_pytz), ('zoneinfo', with_zoneinfo), ('zone tables', with_tables)):
+        results[name] = [fn(compiled, zone, after) for compiled, zone, after in teams]
+        best = None
+        for _ in range(args.rounds):
+            started = time.perf_counter()
+            for compiled, zone, after in teams:
+                fn(compiled, zone, after)
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+
+    print(f"{args.teams} teams over {len(zones)} zones; transition tables built in {build_ms:.1f} ms")
+    for name, elapsed in timings.items():
+        print(f"  {name:14} {elapsed * 1000:8.2f} ms  {elapsed / args.teams * 1e6:6.2f} us/team  "
+              f"speedup vs pytz: {timings['pytz localize'] / elapsed:4.1f}x")
+    for name in ('pytz localize', 'zoneinfo'):
+        mismatches = sum(a != b for a, b in zip(results[name], results['zone tables']))
+        print(f"  {name} vs zone tables: {mismatches} mismatches")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+import csv
+import io
+import json
+import logging
+from datetime import datetime
+from sqlalchemy import insert, update, select, func
+from models import db, Team, Member
+from roster import rotated, bump_roster_version
+from positions import fold_rotation_offset, lock_teams
+from history import record_on_shift
+from utils import update_rotation_schedule, db_now
+from database import read_bind
+from schedule import compile_schedule
+from timezones import DEFAULT_TIMEZONE, zone_table
+
+logger = logging.getLogger(__name__)
+
+# Roster interchange format. JSON is a list of
+#   {"name": ..., "rotation_schedule": ..., "timezone": ..., "members": ["Alice", "Bob", ...]}
+# and CSV has one row per member with the columns below. Members are listed in
+# effective (on-shift) order in both directions. timezone is optional on import.
+
+CSV_FIELDS = ['team', 'rotation_schedule', 'timezone', 'member']
+EXPORT_BATCH_SIZE = 1000
+
+def _team_entry(teams, name, line):
+    name = (name or '').strip()
+    if not name:
+        raise ValueError(f"Missing team name in entry {line}")
+    if len(name) > 64:
+        raise ValueError(f"Team name too long in entry {line}: {name!r}")
+    return teams.setdefault(name, {'rotation_schedule': None, 'timezone': None, 'members': []})
+
+def _timezone(zone, line):
+    zone = zone.strip()
+    try:
+        zone_table(zone)
+    except ValueError:
+        raise ValueError(f"Unknown timezone in entry {line}: {zone!r}")
+    return zone
+
+def _schedule(schedule, line):
+    # A schedule that doesn't parse or never fires would silently fall back to daily rotations
+    schedule = schedule.strip()
+    try:
+        compile_schedule(schedule).next_after(datetime(2000, 1, 1))
+    except ValueError as e:
+        raise ValueError(f"Invalid rotation schedule in entry {line}: {schedule!r}") from e
+    return schedule
+
+def _member_name(name, line):
+    name = (name or '').strip()
+    if not name or len(name) > 64:
+        raise ValueError(f"Invalid member name in entry {line}: {name!r}")
+    return name
+
+def parse_json_roster(data):
+    if not isinstance(data, list):
+        raise ValueError("Expected a list of teams")
+    teams = {}
+    for line, item in enumerate(data, start=1):
+        if not isinstance(item, dict):
+            raise ValueError(f"Entry {line} is not an object")
+        for field in ('name', 'rotation_schedule', 'timezone'):
+            if item.get(field) is not None and not isinstance(item[field], str):
+                raise ValueError(f"{field} in entry {line} must be a string")
+        members = item.get('members') or []
+        if not isinstance(members, list):
+            raise ValueError(f"members in entry {line} must be a list")
+        entry = _team_entry(teams, item.get('name'), line)
+        if item.get('rotation_schedule'):
+            entry['rotation_schedule'] = _schedule(item['rotation_schedule'], line)
+        if item.get('timezone'):
+            entry['timezone'] = _timezone(item['timezone'], line)
+        for member in members:
+            name = member.get('name') if isinstance(member, dict) else member
+            if not isinstance(name, str):
+                raise ValueError(f"Member names in entry {line} must be strings")
+            entry['members'].append(_member_name(name, line))
+    return teams
+
+def parse_csv_roster(text):
+    reader = csv.DictReader(io.StringIO(text))
+    if not reader.fieldnames or 'team' not in reader.fieldnames:
+        raise ValueError(f"CSV header must include: {', '.join(CSV_FIELDS)}")
+    teams = {}
+    for line, row in enumerate(reader, start=2):
+        entry = _team_entry(teams, row.get('team'), line)
+        if row.get('rotation_schedule'):
+            entry['rotation_schedule'] = _schedule(row['rotation_schedule'], line)
+        if row.get('timezone'):
+            entry['timezone'] = _timezone(row['timezone'], line)
+        if row.get('member'):
+            entry['members'].append(_member_name(row['member'], line))
+    return teams
+
+def import_roster(teams):
+    # Insert teams and members with executemany in one transaction. Positions are
+    # assigned arithmetically after each team's current last position.
+    existing, settings = {}, {}
+    for team_id, name, schedule, zone in db.session.query(
+            Team.id, Team.name, Team.rotation_schedule, Team.timezone):
+        existing[name] = team_id
+        settings[name] = (schedule, zone)
+
+    new_teams = [{'name': name, 'rotation_schedule': entry['rotation_schedule'],
+                  'timezone': entry['timezone'] or DEFAULT_TIMEZONE}
+                 for name, entry in teams.items() if name not in existing]
+    if new_teams:
+        db.session.execute(insert(Team), new_teams)
+    # Settings missing from the file keep their current values
+    schedule_updates = [{'id': existing[name],
+                         'rotation_schedule': entry['rotation_schedule'] or settings[name][0],
+                         'timezone': entry['timezone'] or settings[name][1]}
+                        for name, entry in teams.items()
+                        if name in existing and (entry['rotation_schedule'] or entry['timezone'])]
+    if schedule_updates:
+        db.session.execute(update(Team), schedule_updates)
+
+    team_ids = {name: team_id for team_id, name in
+                db.session.query(Team.id, Team.name).filter(Team.name.in_(list(teams)))}
+
+    # Appending to a rotated team must not shift who is on shift, so bake the
+    # offset in first (rare: only existing teams that have rotated). Offsets are
+    # read under the lock, so a rotation committed meanwhile isn't undone
+    offsets = lock_teams(existing[name] for name, entry in teams.items() if entry['members'] and name in existing)
+    for team_id, offset in offsets.items():
+        if offset:
+            fold_rotation_offset(team_id)
+
+    last_positions = dict(db.session.query(Member.team_id, func.max(Member.position))
+                          .filter(Member.team_id.in_(list(team_ids.values())))
+                          .group_by(Member.team_id))
+    member_rows = []
+    for name, entry in teams.items():
+        team_id = team_ids[name]
+        start = last_positions.get(team_id) or 0
+        member_rows.extend({'name': member, 'team_id': team_id, 'position': start + index}
+                           for index, member in enumerate(entry['members'], start=1))
+    if member_rows:
+        db.session.execute(insert(Member), member_rows)
+        record_on_shift(sorted({row['team_id'] for row in member_rows}), 'import', db_now())
+    bump_roster_version(changed=list(team_ids.values()))
+    db.session.commit()
+
+    update_rotation_schedule(*team_ids.values())
+
+    summary = {
+        'teams_created': len(new_teams),
+        'teams_updated': len(teams) - len(new_teams),
+        'members_added': len(member_rows)
+    }
+    logger.info(f"Imported roster: {summary}")
+    return summary
+
+def _iter_teams():
+    # Stream teams with their members in effective order, holding one team at a time
+    # Long-running read, so it goes to the read-only bind when there is one
+    query = select(Team.id, Team.name, Team.rotation_schedule, Team.timezone, Team.rotation_offset, Member.name) \
+        .outerjoin(Member, Member.team_id == Team.id) \
+        .order_by(Team.name, Team.id, Member.position) \
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    rows = db.session.execute(query, bind_arguments={'bind': read_bind()})
+    current, members = None, []
+    for team_id, team_name, schedule, zone, offset, member_name in rows:
+        if current is not None and current[0] != team_id:
+            yield current[1], current[2], current[3], rotated(members, current[4])
+            members = []
+        current = (team_id, team_name, schedule, zone, offset)
+        if member_name is not None:
+            members.append(member_name)
+    if current is not None:
+        yield current[1], current[2], current[3], rotated(members, current[4])
+
+def export_roster_json():
+    yield '['
+    separator = ''
+    for name, schedule, zone, members in _iter_teams():
+        yield separator + json.dumps({'name': name, 'rotation_schedule': schedule, 'timezone': zone,
+                                      'members': members})
+        separator = ',\n'
+    yield ']\n'
+
+def export_roster_csv():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_FIELDS)
+    for name, schedule, zone, members in _iter_teams():
+        for member in members or ['']:
+            writer.writerow([name, schedule or '', zone, member])
+        if buffer.tell() > 64 * 1024:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
@@ -0,0 +1,161 @@
+import json
+import logging
+import signal
+import sys
+import threading
+import time
+from wsgiref.simple_server import make_server, WSGIRequestHandler
+import click
+from flask import current_app
+from auth import issue_api_token, revoke_api_token
+from assets import build_assets
+from models import db, User
+from flask.cli import AppGroup
+from bulk import parse_json_roster, parse_csv_roster, import_roster, export_roster_json, export_roster_csv
+from lease import make_holder_id, acquire_lease, release_lease
+from history import compact_rotation_history
+from metrics import render_metrics
+from utils import scheduler, start_rotation_scheduler, arm_rotation_job, db_now
+
+roster_cli = AppGroup('roster', help='Bulk roster import and export.')
+rotations_cli = AppGroup('rotations', help='Rotation scheduler.')
+users_cli = AppGroup('users', help='Admin users and API tokens.')
+assets_cli = AppGroup('assets', help='Static asset bundles.')
+
+logger = logging.getLogger(__name__)
+
+def _format_for(path, fmt):
+    if fmt:
+        return fmt
+    return 'csv' if path.lower().endswith('.csv') else 'json'
+
+@roster_cli.command('import')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(['json', 'csv']), help='Defaults to the file extension.')
+def import_command(path, fmt):
+    """Import teams and members from a JSON or CSV file."""
+    with open(path, 'r', encoding='utf-8', newline='') as f:
+        text = f.read()
+    try:
+        if _format_for(path, fmt) == 'csv':
+            teams = parse_csv_roster(text)
+        else:
+            teams = parse_json_roster(json.loads(text))
+    except ValueError as e:
+        raise click.ClickException(str(e))
+    summary = import_roster(teams)
+    click.echo(f"Created {summary['teams_created']} teams, updated {summary['teams_updated']}, "
+               f"added {summary['members_added']} members")
+
+@roster_cli.command('export')
+@click.argument('path', required=False, type=click.Path(dir_okay=False, writable=True))
+@click.option('--format', 'fmt', type=click.Choice(['json', 'csv']), help='Defaults to the file extension.')
+def export_command(path, fmt):
+    """Export the full roster to a file, or stdout when no path is given."""
+    chunks = export_roster_csv() if _format_for(path or '', fmt) == 'csv' else export_roster_json()
+    out = open(path, 'w', encoding='utf-8', newline='') if path else sys.stdout
+    try:
+        for chunk in chunks:
+            out.write(chunk)
+    finally:
+        if path:
+            out.close()
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+def _metrics_app(environ, start_response):
+    start_response('200 OK', [('Content-Type', 'text/plain; version=0.0.4')])
+    # Only this process; /metrics on the web workers already includes it when they share METRICS_DIR
+    return [render_metrics(all_processes=False).encode()]
+
+def _serve_metrics(port):
+    # The worker has no web server of its own, so scheduler metrics get a tiny one
+    server = make_server('0.0.0.0', port, _metrics_app, handler_class=_QuietHandler)
+    threading.Thread(target=server.serve_forever, name='metrics', daemon=True).start()
+    logger.info(f"Serving rotation metrics on port {port}")
+
+@rotations_cli.command('worker')
+@click.option('--metrics-port', type=int, envvar='ROTATION_METRICS_PORT', default=0,
+              help='Serve /metrics for the scheduler on this port (0 disables).')
+def worker_command(metrics_port):
+    """Run the rotation scheduler while holding the rotation lease."""
+    app = current_app._get_current_object()
+    if metrics_port:
+        _serve_metrics(metrics_port)
+    ttl = app.config['SCHEDULER_LEASE_SECONDS']
+    holder = make_holder_id()
+    # check_rotations re-checks the lease before every run, so a paused or
+    # partitioned worker can't rotate after another one has taken over
+    app.config['SCHEDULER_LEASE_HOLDER'] = holder
+    leader = False
+    # gunicorn stops the worker with SIGTERM; exit cleanly so the lease is released
+    signal.signal(signal.SIGTERM, lambda *args: sys.exit(0))
+    try:
+        while True:
+            if acquire_lease(holder, ttl):
+                if not scheduler.running:
+                    logger.info(f"Acquired rotation lease as {holder}")
+                    start_rotation_scheduler(app)
+                elif not leader:
+                    logger.info(f"Reacquired rotation lease as {holder}")
+                    scheduler.resume()
+                    arm_rotation_job(app)
+                leader = True
+            elif leader:
+                logger.warning("Lost rotation lease; pausing the scheduler")
+                scheduler.pause()
+                leader = False
+            time.sleep(max(ttl / 3, 1))
+    except (KeyboardInterrupt, SystemExit):
+        if scheduler.running:
+            scheduler.shutdown()
+        if leader:
+            release_lease(holder)
+
+@rotations_cli.command('compact-history')
+@click.option('--days', type=int, help='Retention window; defaults to ROTATION_HISTORY_DAYS.')
+def compact_history_command(days):
+    """Remove redundant and expired rotation history events."""
+    removed = compact_rotation_history(db_now(), days or current_app.config['ROTATION_HISTORY_DAYS'])
+    if removed is None:
+        raise click.ClickException("Compaction failed; see the log for details")
+    click.echo(f"Removed {removed} rotation events")
+
+def _user_or_fail(username):
+    user = User.query.filter_by(username=username).first()
+    if user is None:
+        raise click.ClickException(f"No user named {username!r}")
+    return user
+
+@users_cli.command('set-password')
+@click.argument('username')
+@click.password_option()
+def set_password_command(username, password):
+    """Change a user's password."""
+    user = _user_or_fail(username)
+    user.set_password(password)
+    db.session.commit()
+    click.echo(f"Password changed for {username}")
+
+@users_cli.command('create-token')
+@click.argument('username')
+@click.option('--name', default='automation', help='Label to recognise the token by.')
+def create_token_command(username, name):
+    """Issue an API token for a user; it is shown only once."""
+    click.echo(issue_api_token(_user_or_fail(username), name))
+
+@users_cli.command('revoke-token')
+@click.argument('token_id', type=int)
+def revoke_token_command(token_id):
+    """Revoke an API token by its id."""
+    if not revoke_api_token(token_id):
+        raise click.ClickException(f"No token with id {token_id}")
+    click.echo(f"Token {token_id} revoked")
+
+@assets_cli.command('build')
+def build_assets_command():
+    """Write hashed, minified and precompressed assets to static/dist."""
+    manifest = build_assets(current_app.static_folder)
+    click.echo(f"Built {len(manifest)} assets")
@@ -4,3 +4,45 @@ class Config:
     SECRET_KEY = os.environ.get('SECRET_KEY') or os.urandom(32)
     SQLALCHEMY_DATABASE_URI = os.environ.get('DATABASE_URL') or 'sqlite:///team_management.db'
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Database profile, applied by database.configure_database. SQLite connections:
+    SQLITE_JOURNAL_MODE = os.environ.get('SQLITE_JOURNAL_MODE', 'WAL')
+    SQLITE_SYNCHRONOUS = os.environ.get('SQLITE_SYNCHRONOUS', 'NORMAL')
+    SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get('SQLITE_BUSY_TIMEOUT_MS', 5000))
+    SQLITE_READ_ONLY_BIND = os.environ.get('SQLITE_READ_ONLY_BIND', '1').lower() in ('1', 'true', 'yes')
+    # Server databases (Postgres, MySQL):
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 10))
+    DB_MAX_OVERFLOW = int(os.environ.get('DB_MAX_OVERFLOW', 20))
+    DB_POOL_TIMEOUT = int(os.environ.get('DB_POOL_TIMEOUT', 30))
+    DB_POOL_RECYCLE = int(os.environ.get('DB_POOL_RECYCLE', 1800))
+    DB_POOL_PRE_PING = os.environ.get('DB_POOL_PRE_PING', '1').lower() in ('1', 'true', 'yes')
+    DATABASE_READ_URL = os.environ.get('DATABASE_READ_URL')
+    # Logged-in users are cached per process for this long; API tokens are checked on every request
+    USER_CACHE_SECONDS = int(os.environ.get('USER_CACHE_SECONDS', 60))
+    USER_CACHE_SIZE = int(os.environ.get('USER_CACHE_SIZE', 1024))
+    # HMAC key for API token digests; changing it revokes every token
+    API_TOKEN_KEY = os.environ.get('API_TOKEN_KEY', '')
+    # Login attempts allowed per client IP per minute, before any password hashing. Counted
+    # per process, so under gunicorn a client gets up to this many from each worker.
+    LOGIN_ATTEMPTS_PER_MINUTE = int(os.environ.get('LOGIN_ATTEMPTS_PER_MINUTE', 10))
+    # Reverse proxies in front of the app whose X-Forwarded-For/-Proto/-Host headers are
+    # trusted. Behind one, set it to 1 so the client IP (and login throttling) is the real one.
+    # Leave 0 when clients connect directly, or they could pick their own address.
+    TRUSTED_PROXIES = int(os.environ.get('TRUSTED_PROXIES', 0))
+    # How often each process checks the roster version to push changes made elsewhere to its streams
+    ROSTER_POLL_SECONDS = float(os.environ.get('ROSTER_POLL_SECONDS', 1))
+    # Open /api/stream connections per process. Each one holds a server thread for as
+    # long as it is open, so keep this well under WEB_THREADS; clients over it poll instead.
+    STREAM_MAX_SUBSCRIBERS = int(os.environ.get('STREAM_MAX_SUBSCRIBERS', int(os.environ.get('WEB_THREADS', 8)) // 2))
+    # Directory where every process writes its metrics, so /metrics on any worker reports
+    # them all; gunicorn.conf.py sets a fresh one. Unset, each process reports only its own.
+    METRICS_DIR = os.environ.get('METRICS_DIR')
+    # Only the process that owns rotations should run the scheduler
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '').lower() in ('1', 'true', 'yes')
+    # How often the scheduler re-reads rotation_state to pick up edits made by other processes
+    SCHEDULER_RESYNC_SECONDS = int(os.environ.get('SCHEDULER_RESYNC_SECONDS', 60))
+    # 'sqlalchemy' keeps scheduled jobs in the app database, 'memory' keeps them in-process
+    SCHEDULER_JOBSTORE = os.environ.get('SCHEDULER_JOBSTORE', 'sqlalchemy')
+    # The rotation worker holds a database lease for this long and renews it every third of it
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', 15))
+    # Rotation history older than this is compacted to one event per team
+    ROTATION_HISTORY_DAYS = int(os.environ.get('ROTATION_HISTORY_DAYS', 730))
@@ -0,0 +1,88 @@
+import logging
+from functools import partial
+from sqlalchemy import event, inspect, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.schema import CreateColumn
+from models import db
+
+logger = logging.getLogger(__name__)
+
+# Engine settings per database family, derived from Config. SQLite gets WAL,
+# a busy timeout and relaxed fsyncs on every connection, plus a read-only bind
+# for long reads. Server databases get a sized, pre-pinged, recycled pool and
+# an optional read replica.
+
+READ_ONLY_BIND = 'readonly'
+SQLITE_SYNCHRONOUS_MODES = ('OFF', 'NORMAL', 'FULL', 'EXTRA')
+
+def _is_sqlite_file(url):
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+def configure_database(app):
+    # Call before db.init_app; explicit SQLALCHEMY_ENGINE_OPTIONS/BINDS entries win
+    config = app.config
+    url = make_url(config['SQLALCHEMY_DATABASE_URI'])
+    options = dict(config.get('SQLALCHEMY_ENGINE_OPTIONS') or {})
+    binds = dict(config.get('SQLALCHEMY_BINDS') or {})
+
+    if url.get_backend_name() == 'sqlite':
+        if _is_sqlite_file(url) and config['SQLITE_READ_ONLY_BIND']:
+            database = url.database if url.query.get('uri') else f'file:{url.database}'
+            binds.setdefault(READ_ONLY_BIND, url.set(database=database,
+                                                     query=dict(url.query, mode='ro', uri='true')).render_as_string(False))
+    else:
+        options.setdefault('pool_size', config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', config['DB_POOL_TIMEOUT'])
+        options.setdefault('pool_recycle', config['DB_POOL_RECYCLE'])
+        options.setdefault('pool_pre_ping', config['DB_POOL_PRE_PING'])
+        if config['DATABASE_READ_URL']:
+            binds.setdefault(READ_ONLY_BIND, dict(options, url=config['DATABASE_READ_URL']))
+
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = options
+    config['SQLALCHEMY_BINDS'] = binds
+
+def _sqlite_pragmas(config, read_only, dbapi_connection, connection_record):
+    synchronous = config['SQLITE_SYNCHRONOUS'].upper()
+    if synchronous not in SQLITE_SYNCHRONOUS_MODES:
+        raise ValueError(f"SQLITE_SYNCHRONOUS must be one of {', '.join(SQLITE_SYNCHRONOUS_MODES)}")
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {int(config['SQLITE_BUSY_TIMEOUT_MS'])}")
+    if read_only:
+        cursor.execute("PRAGMA query_only = ON")
+    elif config['SQLITE_JOURNAL_MODE']:
+        # WAL lets readers run alongside the single writer; it persists in the file
+        cursor.execute(f"PRAGMA journal_mode = {config['SQLITE_JOURNAL_MODE']}")
+    cursor.execute(f"PRAGMA synchronous = {synchronous}")
+    cursor.close()
+
+def init_database(app):
+    # Call after db.init_app
+    with app.app_context():
+        for key, engine in db.engines.items():
+            if engine.dialect.name == 'sqlite':
+                event.listen(engine, 'connect', partial(_sqlite_pragmas, app.config, key == READ_ONLY_BIND))
+
+def read_bind():
+    # Engine for long read-only work; the primary when no read-only bind is configured
+    return db.engines.get(READ_ONLY_BIND) or db.engine
+
+def missing_columns():
+    # create_all skips existing tables; (table, column) pairs for columns introduced since
+    inspector = inspect(db.engine)
+    missing = []
+    for table in db.metadata.sorted_tables:
+        if inspector.has_table(table.name):
+            present = {column['name'] for column in inspector.get_columns(table.name)}
+            missing.extend((table.name, column.name) for column in table.columns if column.name not in present)
+    return missing
+
+def add_columns(columns):
+    # New columns must be nullable or have a server default. Runs in the
+    # session's transaction, after any data migration; the caller commits.
+    dialect = db.engine.dialect
+    for table_name, column_name in columns:
+        table = db.metadata.tables[table_name]
+        ddl = CreateColumn(table.c[column_name]).compile(dialect=dialect)
+        db.session.execute(text(f"ALTER TABLE {dialect.identifier_preparer.format_table(table)} ADD COLUMN {ddl}"))
+        logger.info(f"Adding column {table_name}.{column_name}")
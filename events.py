@@ -0,0 +1,49 @@
+import json
+import queue
+import threading
+
+# Fan-out hub for server-sent events. Each change is serialized once and the
+# same bytes are handed to every subscriber's queue. Subscribers that fall too
+# far behind are dropped and reconnect, instead of buffering without bound.
+# Every open stream holds a server thread, so subscribe() can be capped.
+
+SUBSCRIBER_QUEUE_SIZE = 64
+
+class EventHub:
+    def __init__(self):
+        self._subscribers = set()
+        self._lock = threading.Lock()
+
+    def has_subscribers(self):
+        return bool(self._subscribers)
+
+    def subscribe(self, limit=None):
+        # Returns None when limit subscribers are already connected
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        with self._lock:
+            if limit is not None and len(self._subscribers) >= limit:
+                return None
+            self._subscribers.add(subscriber)
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+
+    def publish(self, event, data):
+        message = f"event: {event}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n".encode()
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for subscriber in subscribers:
+            try:
+                subscriber.put_nowait(message)
+            except queue.Full:
+                self.unsubscribe(subscriber)
+                # Make room for the sentinel that ends the slow client's stream
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    pass
+                subscriber.put_nowait(None)
+
+roster_hub = EventHub()
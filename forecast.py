@@ -0,0 +1,123 @@
+import json
+from datetime import timedelta
+from models import db, RotationState
+from roster import load_roster
+from schedule import compile_schedule
+from timezones import DEFAULT_TIMEZONE, zone_table
+from utils import db_now
+
+# Forecasts project the current roster forward without touching the database
+# again: the k-th rotation from now puts effective position (k mod team size) + 1
+# on shift, and the number of rotations before the window is counted from the
+# compiled schedule instead of being replayed. Times are naive UTC, like
+# rotation_state; JSON output shows them in the team's timezone.
+
+DEFAULT_FORECAST_DAYS = 30
+MAX_FORECAST_DAYS = 366 * 5
+
+def forecast_window(start, end):
+    # A forecast can't start in the past: earlier rosters are not derivable from the current one
+    now = db_now()
+    start = max(start or now, now)
+    end = end or start + timedelta(days=DEFAULT_FORECAST_DAYS)
+    if end <= start:
+        raise ValueError("to must be after from")
+    if end - start > timedelta(days=MAX_FORECAST_DAYS):
+        raise ValueError(f"Forecast range is limited to {MAX_FORECAST_DAYS} days")
+    return start, end
+
+def load_forecast_teams(team_id=None):
+    # Teams in effective order plus their rotation state, in three queries
+    state_query = db.session.query(RotationState.team_id, RotationState.schedule, RotationState.next_rotation)
+    if team_id is not None:
+        state_query = state_query.filter(RotationState.team_id == team_id)
+    states = {row.team_id: (row.schedule, row.next_rotation) for row in state_query}
+    return [(team, states.get(team['id'], (None, None))) for team in load_roster(team_id)]
+
+def forecast_shifts(members, schedule, next_rotation, start, end, zone=DEFAULT_TIMEZONE):
+    # Yields (shift_start, shift_end, member) covering [start, end)
+    if not members:
+        return
+    if len(members) == 1 or not schedule or next_rotation is None:
+        yield start, end, members[0]
+        return
+
+    compiled = compile_schedule(schedule)
+    table = zone_table(zone)
+    if next_rotation <= start:
+        rotations = 1 + compiled.count_utc(table, next_rotation, start)
+        instant = compiled.next_utc(table, start, anchor=next_rotation)
+    else:
+        rotations = 0
+        instant = next_rotation
+
+    index = rotations % len(members)
+    shift_start = start
+    while instant < end:
+        yield shift_start, instant, members[index]
+        shift_start = instant
+        index = (index + 1) % len(members)
+        instant = compiled.next_utc(table, instant, anchor=next_rotation)
+    yield shift_start, end, members[index]
+
+def _isoformat(value, zone):
+    return zone_table(zone).to_aware(value).isoformat()
+
+def forecast_json(teams, start, end, single=False):
+    yield '' if single else '['
+    separator = ''
+    for team, (schedule, next_rotation) in teams:
+        zone = team['timezone']
+        header = json.dumps({'id': team['id'], 'name': team['name'], 'rotation_schedule': schedule,
+                             'timezone': zone, 'from': _isoformat(start, zone), 'to': _isoformat(end, zone)})
+        yield separator + header[:-1] + ', "shifts": ['
+        shift_separator = ''
+        for shift_start, shift_end, member in forecast_shifts(team['members'], schedule, next_rotation,
+                                                              start, end, zone):
+            yield shift_separator + json.dumps({
+                'start': _isoformat(shift_start, zone),
+                'end': _isoformat(shift_end, zone),
+                'member': {'id': member['id'], 'name': member['name']}
+            })
+            shift_separator = ', '
+        yield ']}'
+        separator = ',\n'
+    yield '\n' if single else ']\n'
+
+def _ics_text(value):
+    return value.replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,').replace('\n', '\\n')
+
+def _ics_line(line):
+    # Content lines are folded at 75 octets (RFC 5545)
+    encoded = line.encode()
+    if len(encoded) <= 75:
+        return line + '\r\n'
+    chunks, current = [], b''
+    for char in line:
+        char_bytes = char.encode()
+        if len(current) + len(char_bytes) > (75 if not chunks else 74):
+            chunks.append(current.decode())
+            current = b''
+        current += char_bytes
+    chunks.append(current.decode())
+    return '\r\n '.join(chunks) + '\r\n'
+
+def _ics_time(value):
+    return value.strftime('%Y%m%dT%H%M%SZ')
+
+def forecast_ics(teams, start, end):
+    stamp = _ics_time(db_now())
+    yield 'BEGIN:VCALENDAR\r\nVERSION:2.0\r\nPRODID:-//TeamShiftManagement//Forecast//EN\r\nCALSCALE:GREGORIAN\r\n'
+    for team, (schedule, next_rotation) in teams:
+        for shift_start, shift_end, member in forecast_shifts(team['members'], schedule, next_rotation,
+                                                              start, end, team['timezone']):
+            yield ''.join([
+                'BEGIN:VEVENT\r\n',
+                _ics_line(f"UID:team-{team['id']}-{_ics_time(shift_start)}@teamshiftmanagement"),
+                f"DTSTAMP:{stamp}\r\n",
+                f"DTSTART:{_ics_time(shift_start)}\r\n",
+                f"DTEND:{_ics_time(shift_end)}\r\n",
+                _ics_line(f"SUMMARY:{_ics_text(member['name'])} on shift ({_ics_text(team['name'])})"),
+                'END:VEVENT\r\n'
+            ])
+    yield 'END:VCALENDAR\r\n'
@@ -0,0 +1,49 @@
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+bind = os.environ.get('BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('WEB_CONCURRENCY', 2 * (os.cpu_count() or 1) + 1))
+# Each open /api/stream connection holds one of a worker's threads; STREAM_MAX_SUBSCRIBERS
+# (default half of WEB_THREADS) caps them per worker so the rest keep serving the API
+worker_class = 'gthread'
+threads = int(os.environ.get('WEB_THREADS', 8))
+timeout = 60
+# create_app() has no side effects, so import once in the master and fork
+preload_app = True
+accesslog = '-'
+
+# Scrapes land on any worker, so every process (including the rotation worker)
+# writes its metrics here and /metrics reports the sum. Set before the app is loaded.
+_own_metrics_dir = None
+if not os.environ.get('METRICS_DIR'):
+    _own_metrics_dir = os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='team-metrics-')
+
+# Web workers never run the scheduler; a single rotation worker is started
+# next to them unless it runs elsewhere (RUN_ROTATION_WORKER=0)
+raw_env = ['SCHEDULER_ENABLED=0']
+_rotation_worker = None
+
+def on_starting(server):
+    # Totals from a previous run in a reused METRICS_DIR would be summed in again
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.unlink(path)
+
+def when_ready(server):
+    global _rotation_worker
+    if os.environ.get('RUN_ROTATION_WORKER', '1').lower() in ('1', 'true', 'yes'):
+        server.log.info("Starting rotation worker")
+        _rotation_worker = subprocess.Popen(
+            [sys.executable, '-m', 'flask', '--app', 'main', 'rotations', 'worker'],
+            env=dict(os.environ, SCHEDULER_ENABLED='0')
+        )
+
+def on_exit(server):
+    if _rotation_worker is not None and _rotation_worker.poll() is None:
+        _rotation_worker.terminate()
+        _rotation_worker.wait(timeout=10)
+    if _own_metrics_dir is not None:
+        shutil.rmtree(_own_metrics_dir, ignore_errors=True)
@@ -0,0 +1,71 @@
+import logging
+from datetime import timedelta
+from sqlalchemy import insert, select, delete, func, and_, literal
+from models import db, Team, RotationEvent
+from roster import effective_positions
+
+logger = logging.getLogger(__name__)
+
+# Rotation history answers "who was on shift at T": the latest event at or
+# before T names the member who went on shift. Events are written in the same
+# transaction as the change they record. Times are naive UTC, like
+# rotation_state.
+
+def record_on_shift(team_ids, kind, occurred_at):
+    # One INSERT ... SELECT for all teams; call after the change, before commit
+    if not team_ids:
+        return
+    team_ids = list(team_ids)
+    db.session.flush()
+    ranked, position = effective_positions(team_ids)
+    on_shift = select(
+        Team.id, literal(occurred_at), literal(kind), ranked.c.member_id, ranked.c.member_name
+    ).select_from(Team) \
+        .outerjoin(ranked, and_(ranked.c.team_id == Team.id, position == 1)) \
+        .where(Team.id.in_(team_ids))
+    db.session.execute(insert(RotationEvent).from_select(
+        ['team_id', 'occurred_at', 'kind', 'member_id', 'member_name'], on_shift
+    ))
+
+def record_team_deleted(team_id, occurred_at):
+    db.session.add(RotationEvent(team_id=team_id, occurred_at=occurred_at, kind='delete'))
+
+def on_shift_at(team_id, at):
+    # Served by ix_rotation_event_team_time
+    return RotationEvent.query \
+        .filter(RotationEvent.team_id == team_id, RotationEvent.occurred_at <= at) \
+        .order_by(RotationEvent.occurred_at.desc(), RotationEvent.id.desc()) \
+        .first()
+
+def compact_rotation_history(now, retention_days):
+    # Drop events that don't change who is on shift, then events older than the
+    # retention window except the last one per team, which still answers
+    # lookups at the start of the window
+    previous_member = func.lag(RotationEvent.member_id).over(
+        partition_by=RotationEvent.team_id, order_by=(RotationEvent.occurred_at, RotationEvent.id))
+    previous_kind = func.lag(RotationEvent.kind).over(
+        partition_by=RotationEvent.team_id, order_by=(RotationEvent.occurred_at, RotationEvent.id))
+    sequenced = select(RotationEvent.id, RotationEvent.member_id, RotationEvent.kind,
+                       previous_member.label('previous_member'), previous_kind.label('previous_kind')).subquery()
+    repeated = select(sequenced.c.id).where(
+        sequenced.c.member_id == sequenced.c.previous_member,
+        sequenced.c.kind != 'delete',
+        sequenced.c.previous_kind != 'delete'
+    )
+
+    cutoff = now - timedelta(days=retention_days)
+    anchors = select(func.max(RotationEvent.id)) \
+        .where(RotationEvent.occurred_at < cutoff) \
+        .group_by(RotationEvent.team_id)
+    try:
+        deduplicated = db.session.execute(
+            delete(RotationEvent).where(RotationEvent.id.in_(repeated))).rowcount
+        expired = db.session.execute(
+            delete(RotationEvent).where(RotationEvent.occurred_at < cutoff, RotationEvent.id.not_in(anchors))).rowcount
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Error compacting rotation history: {str(e)}")
+        db.session.rollback()
+        return None
+    logger.info(f"Compacted rotation history: {deduplicated} repeated and {expired} expired events removed")
+    return deduplicated + expired
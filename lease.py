@@ -0,0 +1,56 @@
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from sqlalchemy import or_
+from sqlalchemy.exc import IntegrityError
+from models import db, SchedulerLease
+
+logger = logging.getLogger(__name__)
+
+ROTATION_LEASE = 'rotations'
+
+def make_holder_id():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+def _utcnow():
+    return datetime.utcnow().replace(microsecond=0)
+
+def acquire_lease(holder, ttl_seconds, name=ROTATION_LEASE):
+    # Take or renew the lease with a single conditional UPDATE, so two nodes can
+    # never both see success for the same period
+    now = _utcnow()
+    try:
+        renewed = SchedulerLease.query \
+            .filter(SchedulerLease.name == name,
+                    or_(SchedulerLease.holder == holder, SchedulerLease.expires_at < now)) \
+            .update({SchedulerLease.holder: holder,
+                     SchedulerLease.expires_at: now + timedelta(seconds=ttl_seconds)},
+                    synchronize_session=False)
+        if renewed:
+            db.session.commit()
+            return True
+        if db.session.get(SchedulerLease, name) is None:
+            db.session.add(SchedulerLease(name=name, holder=holder,
+                                          expires_at=now + timedelta(seconds=ttl_seconds)))
+            db.session.commit()
+            return True
+        db.session.rollback()
+    except IntegrityError:
+        # Another node inserted the lease row first
+        db.session.rollback()
+    except Exception as e:
+        logger.error(f"Error acquiring lease {name}: {str(e)}")
+        db.session.rollback()
+    return False
+
+def release_lease(holder, name=ROTATION_LEASE):
+    try:
+        SchedulerLease.query \
+            .filter(SchedulerLease.name == name, SchedulerLease.holder == holder) \
+            .update({SchedulerLease.expires_at: _utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Error releasing lease {name}: {str(e)}")
+        db.session.rollback()
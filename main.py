@@ -1,33 +1,63 @@
 import logging
 import subprocess
 import os
-from flask import Flask
-from flask_sqlalchemy import SQLAlchemy
+import click
+from flask import Flask, current_app
+from flask.cli import with_appcontext
 from flask_migrate import Migrate
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
 from models import db, User
 from auth import login_manager
+from metrics import init_metrics
+from database import configure_database, init_database, missing_columns, add_columns
+from assets import init_assets, build_assets
+from roster import ensure_roster_version
 from routes import bp
-from utils import start_scheduler, schedule_rotations, check_scheduler_state, check_scheduled_jobs
-from apscheduler.schedulers.background import BackgroundScheduler
+from cli import roster_cli, rotations_cli, users_cli, assets_cli
+from timezones import DEFAULT_TIMEZONE
+from utils import (scheduler, start_scheduler, start_rotation_scheduler, check_scheduler_state, check_scheduled_jobs,
+                   import_rotation_file, convert_stored_times_to_utc)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__, static_folder=os.path.abspath('static'))
-app.config.from_object(Config)
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-db.init_app(app)
-migrate = Migrate(app, db)
-login_manager.init_app(app)
-login_manager.login_view = 'main.login'
+migrate = Migrate()
 
-app.register_blueprint(bp)
+def create_app(config_class=Config):
+    # Creating the app has no side effects: no CSS build, no schema changes and
+    # no scheduler unless SCHEDULER_ENABLED is set for this process
+    app = Flask(__name__, static_folder=os.path.join(BASE_DIR, 'static'))
+    app.config.from_object(config_class)
+    proxies = app.config['TRUSTED_PROXIES']
+    if proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=proxies, x_proto=proxies, x_host=proxies)
 
-def create_default_user():
+    configure_database(app)
+    db.init_app(app)
+    init_database(app)
+    migrate.init_app(app, db)
+    login_manager.init_app(app)
+    login_manager.login_view = 'main.login'
+
+    app.register_blueprint(bp)
+    init_metrics(app)
+    init_assets(app)
+    app.cli.add_command(roster_cli)
+    app.cli.add_command(rotations_cli)
+    app.cli.add_command(users_cli)
+    app.cli.add_command(assets_cli)
+    app.cli.add_command(init_db_command)
+
+    if app.config['SCHEDULER_ENABLED']:
+        start_rotation_scheduler(app)
+    return app
+
+def create_default_user(app):
     with app.app_context():
         try:
-            db.create_all()
             if not User.query.first():
                 default_admin = User(username='admin')
                 default_admin.set_password('Sistem01*1')
@@ -40,27 +70,36 @@ def create_default_user():
 
 def build_css():
     try:
-        subprocess.run(["node", "build_css.js"], check=True)
+        subprocess.run(["node", "build_css.js"], check=True, cwd=BASE_DIR)
         logger.info("CSS built successfully")
     except subprocess.CalledProcessError as e:
         logger.error(f"Error building CSS: {e}")
     except FileNotFoundError:
         logger.error("Node.js not found. Please install Node.js to build CSS.")
 
-def initialize_app():
+def init_db(app):
     with app.app_context():
         try:
             db.create_all()
-            start_scheduler()
-            schedule_rotations(app)
-            check_scheduler_state()
-            check_scheduled_jobs()
-            logger.info("App initialized successfully")
+            missing = missing_columns()
+            if ('rotation_state', 'timezone') in missing:
+                # Stored times predate per-team timezones, when they were local to the
+                # default one. Converting first keeps the column and the data in one transaction.
+                convert_stored_times_to_utc(DEFAULT_TIMEZONE)
+            add_columns(missing)
+            db.session.commit()
+            ensure_roster_version()
+            # create_all skips existing tables, so add indexes introduced since
+            for table in db.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(db.engine, checkfirst=True)
+            import_rotation_file()
         except Exception as e:
-            logger.error(f"Error initializing app: {str(e)}")
+            logger.error(f"Error initializing database: {str(e)}")
             logger.exception("Traceback:")
+    create_default_user(app)
 
-def periodic_scheduler_check():
+def periodic_scheduler_check(app):
     with app.app_context():
         try:
             check_scheduler_state()
@@ -72,11 +111,19 @@ def periodic_scheduler_check():
             logger.error(f"Error during periodic scheduler check: {str(e)}")
             logger.exception("Traceback:")
 
-build_css()
-create_default_user()
-
-with app.app_context():
-    initialize_app()
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create tables, import legacy rotation state and the default admin."""
+    init_db(current_app._get_current_object())
+    click.echo("Database initialized")
 
 if __name__ == '__main__':
+    # Development server: rebuild assets and run the scheduler in-process
+    build_css()
+    build_assets(os.path.join(BASE_DIR, 'static'))
+    app = create_app()
+    init_db(app)
+    if not app.config['SCHEDULER_ENABLED']:
+        start_rotation_scheduler(app)
     app.run(host='0.0.0.0', port=5000)
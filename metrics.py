@@ -0,0 +1,231 @@
+import json
+import os
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Metrics in the Prometheus text format. Every thread records into its own
+# shard, so the hot path takes no locks; a scrape sums the shards.
+#
+# gunicorn answers /metrics from whichever worker gets the request, so with
+# METRICS_DIR set every process (web workers and the rotation worker) also
+# writes its totals there every few seconds, and a scrape sums all the files.
+# Files of exited processes are kept, so counters never go backwards.
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 500)
+LAG_BUCKETS = (0.1, 0.5, 1, 5, 15, 60, 300, 900, 3600)
+SNAPSHOT_SECONDS = 5
+
+_metrics = []
+_metrics_dir = None
+# Process whose snapshot thread is running; a forked worker starts its own
+_snapshot_pid = None
+_snapshot_path = None
+_snapshot_lock = threading.Lock()
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._local = threading.local()
+        self._shards = []
+        _metrics.append(self)
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            self._shards.append(shard)
+            _start_snapshots()
+        return shard
+
+    def totals(self):
+        totals = {}
+        for shard in list(self._shards):
+            for key, value in list(shard.items()):
+                totals[key] = self.merge(totals.get(key), value)
+        return totals
+
+    def _label_text(self, values, extra=''):
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, values)]
+        if extra:
+            pairs.append(extra)
+        return '{' + ','.join(pairs) + '}' if pairs else ''
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, *label_values, amount=1):
+        shard = self._shard()
+        shard[label_values] = shard.get(label_values, 0) + amount
+
+    @staticmethod
+    def merge(total, value):
+        return value if total is None else total + value
+
+    def render(self, totals):
+        if not totals and not self.labels:
+            totals[()] = 0
+        for key, value in sorted(totals.items()):
+            yield f'{self.name}{self._label_text(key)} {value}'
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = buckets
+
+    def observe(self, value, *label_values, count=1):
+        shard = self._shard()
+        series = shard.get(label_values)
+        if series is None:
+            # Per-bucket counts (the last one is +Inf), then sum and count
+            series = shard[label_values] = [0] * (len(self.buckets) + 3)
+        series[bisect_left(self.buckets, value)] += count
+        series[-2] += value * count
+        series[-1] += count
+
+    @staticmethod
+    def merge(total, series):
+        if total is None:
+            return list(series)
+        return [a + b for a, b in zip(total, series)]
+
+    def render(self, totals):
+        for key, series in sorted(totals.items()):
+            cumulative = 0
+            for bound, value in zip(self.buckets + ('+Inf',), series):
+                cumulative += value
+                bucket_label = 'le="' + str(bound) + '"'
+                yield f'{self.name}_bucket{self._label_text(key, bucket_label)} {cumulative}'
+            yield f'{self.name}_sum{self._label_text(key)} {series[-2]}'
+            yield f'{self.name}_count{self._label_text(key)} {series[-1]}'
+
+request_duration = Histogram('http_request_duration_seconds', 'Request latency by endpoint',
+                             labels=('endpoint', 'method'))
+request_sql_statements = Histogram('http_request_sql_statements', 'SQL statements executed per request',
+                                   labels=('endpoint',), buckets=COUNT_BUCKETS)
+request_sql_duration = Histogram('http_request_sql_duration_seconds', 'Time spent in SQL per request',
+                                 labels=('endpoint',))
+check_duration = Histogram('rotation_check_duration_seconds', 'Duration of check_rotations runs')
+rotation_lag = Histogram('rotation_lag_seconds', 'Time between the scheduled and the actual rotation',
+                         buckets=LAG_BUCKETS)
+rotation_team_duration = Histogram('rotation_team_duration_seconds',
+                                   'Rotation time per team (batch duration divided by batch size)')
+rotations_total = Counter('rotations_total', 'Teams rotated')
+rotation_failures_total = Counter('rotation_failures_total', 'Failed rotation batches')
+
+# Per-thread SQL tally for the request being served: [statements, seconds], or None
+_sql_state = threading.local()
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if getattr(_sql_state, 'tally', None) is not None:
+        conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    tally = getattr(_sql_state, 'tally', None)
+    started = conn.info.get('query_started')
+    if tally is not None and started:
+        tally[0] += 1
+        tally[1] += time.perf_counter() - started.pop()
+
+def _endpoint():
+    return request.endpoint or 'unmatched'
+
+def _write_snapshot():
+    snapshot = {metric.name: [[list(key), value] for key, value in metric.totals().items()] for metric in _metrics}
+    # Written aside and renamed, so readers never see a partial file
+    with open(_snapshot_path + '.tmp', 'w') as f:
+        json.dump(snapshot, f)
+    os.replace(_snapshot_path + '.tmp', _snapshot_path)
+
+def _snapshot_loop():
+    while True:
+        time.sleep(SNAPSHOT_SECONDS)
+        try:
+            _write_snapshot()
+        except OSError:
+            pass
+
+def _start_snapshots():
+    global _snapshot_pid, _snapshot_path
+    if _metrics_dir is None or _snapshot_pid == os.getpid():
+        return
+    with _snapshot_lock:
+        if _snapshot_pid != os.getpid():
+            # A random suffix keeps a reused pid from overwriting an exited process's totals
+            _snapshot_path = os.path.join(_metrics_dir, f'{os.getpid()}-{uuid.uuid4().hex[:8]}.json')
+            threading.Thread(target=_snapshot_loop, name='metrics-snapshot', daemon=True).start()
+            _snapshot_pid = os.getpid()
+
+def _all_process_totals():
+    _start_snapshots()
+    _write_snapshot()
+    totals = {metric.name: {} for metric in _metrics}
+    by_name = {metric.name: metric for metric in _metrics}
+    for filename in os.listdir(_metrics_dir):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(_metrics_dir, filename)) as f:
+                snapshot = json.load(f)
+        except (OSError, ValueError):
+            continue
+        for name, entries in snapshot.items():
+            metric = by_name.get(name)
+            if metric is None:
+                continue
+            for key, value in entries:
+                key = tuple(key)
+                totals[name][key] = metric.merge(totals[name].get(key), value)
+    return totals
+
+def init_metrics(app):
+    global _metrics_dir
+    if app.config.get('METRICS_DIR'):
+        _metrics_dir = app.config['METRICS_DIR']
+        os.makedirs(_metrics_dir, exist_ok=True)
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+
+    @app.before_request
+    def start_request_timer():
+        request.environ['metrics.started'] = time.perf_counter()
+        _sql_state.tally = [0, 0.0]
+
+    @app.after_request
+    def record_request_metrics(response):
+        # Streamed bodies are timed up to the first byte
+        started = request.environ.get('metrics.started')
+        tally = getattr(_sql_state, 'tally', None)
+        _sql_state.tally = None
+        if started is not None:
+            endpoint = _endpoint()
+            request_duration.observe(time.perf_counter() - started, endpoint, request.method)
+            if tally is not None:
+                request_sql_statements.observe(tally[0], endpoint)
+                request_sql_duration.observe(tally[1], endpoint)
+        return response
+
+def render_metrics(all_processes=True):
+    # Every process's numbers when METRICS_DIR is set, unless all_processes is False
+    if all_processes and _metrics_dir is not None:
+        totals = _all_process_totals()
+    else:
+        totals = {metric.name: metric.totals() for metric in _metrics}
+    lines = []
+    for metric in _metrics:
+        lines.append(f'# HELP {metric.name} {metric.help_text}')
+        lines.append(f'# TYPE {metric.name} {metric.kind}')
+        lines.extend(metric.render(totals[metric.name]))
+    return '\n'.join(lines) + '\n'
@@ -2,6 +2,7 @@ from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 from flask_login import UserMixin
 from datetime import datetime, timedelta
+from timezones import DEFAULT_TIMEZONE
 
 db = SQLAlchemy()
 
@@ -16,14 +17,70 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
+class ApiToken(db.Model):
+    # Tokens are random, so an HMAC digest is enough; the secret itself is never stored
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, index=True)
+    name = db.Column(db.String(64), nullable=False)
+    digest = db.Column(db.String(64), nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
 class Team(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), unique=True, nullable=False)
     rotation_schedule = db.Column(db.String(64), nullable=True)
+    # IANA zone the rotation schedule is read in
+    timezone = db.Column(db.String(64), nullable=False, default=DEFAULT_TIMEZONE, server_default=DEFAULT_TIMEZONE)
+    # Number of rotations applied since positions were last rewritten
+    rotation_offset = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     members = db.relationship('Member', backref='team', lazy='dynamic', cascade='all, delete-orphan')
+    rotation_state = db.relationship('RotationState', backref='team', uselist=False, cascade='all, delete-orphan')
+
+class RosterVersion(db.Model):
+    # A single row shared by every process. Each roster change bumps it in its own
+    # transaction; the epoch is random per database so ETags never survive a reset.
+    id = db.Column(db.Integer, primary_key=True)
+    epoch = db.Column(db.String(16), nullable=False)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+class RosterChange(db.Model):
+    # Team ids (JSON lists) changed and deleted by each version, so every process
+    # can push changes to its own stream subscribers; old versions are pruned
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    changed = db.Column(db.Text, nullable=False)
+    deleted = db.Column(db.Text, nullable=False)
+
+class RotationState(db.Model):
+    # Times are naive UTC; schedule and timezone are copies of the team's
+    team_id = db.Column(db.Integer, db.ForeignKey('team.id'), primary_key=True)
+    schedule = db.Column(db.String(64), nullable=False)
+    timezone = db.Column(db.String(64), nullable=False, default=DEFAULT_TIMEZONE, server_default=DEFAULT_TIMEZONE)
+    next_rotation = db.Column(db.DateTime, nullable=False, index=True)
+    last_rotation = db.Column(db.DateTime, nullable=True)
 
 class Member(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(64), nullable=False)
     position = db.Column(db.Integer, nullable=False)
     team_id = db.Column(db.Integer, db.ForeignKey('team.id'), nullable=False)
+
+    # Positions are 1..n per team; see positions.py for how they are rewritten
+    __table_args__ = (db.Index('ix_member_team_position', 'team_id', 'position', unique=True),)
+
+class RotationEvent(db.Model):
+    # Append-only record of who went on shift and when. team_id is not a foreign
+    # key so history outlives the team; member_name is a snapshot for the same reason.
+    id = db.Column(db.Integer, primary_key=True)
+    team_id = db.Column(db.Integer, nullable=False)
+    occurred_at = db.Column(db.DateTime, nullable=False)
+    kind = db.Column(db.String(16), nullable=False)
+    member_id = db.Column(db.Integer, nullable=True)
+    member_name = db.Column(db.String(64), nullable=True)
+
+    __table_args__ = (db.Index('ix_rotation_event_team_time', 'team_id', 'occurred_at'),)
+
+class SchedulerLease(db.Model):
+    # Only the holder of an unexpired lease may run rotations; times are naive UTC
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(128), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
@@ -0,0 +1,103 @@
+from sqlalchemy import update, delete, case, func
+from models import db, Team, Member
+
+# Set-based maintenance of Member.position. Stored positions are always 1..n
+# per team, enforced by the unique (team_id, position) index. Rows are moved
+# in two steps: first to the negated target position, then back, so no
+# intermediate row state ever collides with another member's position.
+# Nothing here commits; callers commit once for the whole change.
+#
+# Offsets are read under the team row's write lock, never taken from an
+# earlier read: a rotation committed in between would otherwise be undone.
+
+def lock_teams(team_ids):
+    # A no-op UPDATE locks the team rows until commit on every database (SQLite
+    # ignores FOR UPDATE but takes its write lock). Returns {team_id: offset}
+    # as of the lock; rotations committed after it apply on top of the change.
+    team_ids = list(team_ids)
+    if not team_ids:
+        return {}
+    db.session.execute(
+        update(Team).where(Team.id.in_(team_ids)).values(rotation_offset=Team.rotation_offset)
+        .execution_options(synchronize_session=False)
+    )
+    return dict(db.session.query(Team.id, Team.rotation_offset).filter(Team.id.in_(team_ids)))
+
+def _unstage(team_id):
+    db.session.execute(
+        update(Member)
+        .where(Member.team_id == team_id, Member.position < 0)
+        .values(position=-Member.position)
+        .execution_options(synchronize_session=False)
+    )
+
+def _team_size(team_id):
+    return db.session.query(func.count(Member.id)).filter(Member.team_id == team_id).scalar()
+
+def fold_rotation_offset(team_id):
+    # Bake the offset into stored positions, so stored order is the effective
+    # order again. Returns the team size.
+    offset = lock_teams([team_id]).get(team_id, 0)
+    size = _team_size(team_id)
+    shift = offset % size if size else 0
+    if shift:
+        db.session.execute(
+            update(Member)
+            .where(Member.team_id == team_id)
+            .values(position=-((Member.position - 1 + size - shift) % size + 1))
+            .execution_options(synchronize_session=False)
+        )
+        _unstage(team_id)
+    db.session.execute(
+        update(Team).where(Team.id == team_id).values(rotation_offset=0)
+        .execution_options(synchronize_session=False)
+    )
+    return size
+
+def remove_member(team_id, member_id):
+    # Delete a member and close the gap. The offset is kept rather than folded:
+    # removing someone before the shift point moves the shift point back by one.
+    # Returns False if the member is no longer in the team.
+    offset = lock_teams([team_id]).get(team_id, 0)
+    position = db.session.query(Member.position) \
+        .filter(Member.id == member_id, Member.team_id == team_id).scalar()
+    if position is None:
+        return False
+    size = _team_size(team_id)
+    shift = offset % size
+    db.session.execute(
+        delete(Member).where(Member.id == member_id)
+        .execution_options(synchronize_session=False)
+    )
+    db.session.execute(
+        update(Member)
+        .where(Member.team_id == team_id, Member.position > position)
+        .values(position=-(Member.position - 1))
+        .execution_options(synchronize_session=False)
+    )
+    _unstage(team_id)
+    db.session.execute(
+        update(Team).where(Team.id == team_id)
+        .values(rotation_offset=shift - 1 if position <= shift else shift)
+        .execution_options(synchronize_session=False)
+    )
+    return True
+
+def reorder_members(team_id, order):
+    # order is the new effective order as a list of member ids; the offset starts over.
+    # An empty order (a team without members) has no positions to rewrite, and
+    # CASE needs at least one WHEN.
+    lock_teams([team_id])
+    if order:
+        db.session.execute(
+            update(Member)
+            .where(Member.team_id == team_id)
+            .values(position=-case({member_id: index for index, member_id in enumerate(order, start=1)},
+                                   value=Member.id))
+            .execution_options(synchronize_session=False)
+        )
+        _unstage(team_id)
+    db.session.execute(
+        update(Team).where(Team.id == team_id).values(rotation_offset=0)
+        .execution_options(synchronize_session=False)
+    )
@@ -0,0 +1,287 @@
+import base64
+import binascii
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from sqlalchemy import func, and_, update, insert, delete
+from models import db, Team, Member, RosterVersion, RosterChange
+from events import roster_hub
+
+logger = logging.getLogger(__name__)
+
+# Roster reads go through plain column queries: one for the teams and one for
+# all of their members, regardless of how many teams there are.
+#
+# Rotations only bump Team.rotation_offset, so stored positions are the order
+# as of the last admin edit. The effective order is that list shifted left by
+# rotation_offset mod team size, and effective positions are renumbered 1..n.
+
+# Every roster change bumps the version row in the same transaction, so web
+# workers and the rotation worker all see one version. It doubles as the ETag,
+# and serialized responses are cached per process and version; checking it is
+# one primary-key read. Stream subscribers are fed by a watcher thread that
+# polls the version and publishes the logged changes past it.
+_response_cache = {}
+# Paged and filtered listings add a cache entry per distinct query; start over past this
+RESPONSE_CACHE_ENTRIES = 512
+# Versions kept in the change log; a watcher further behind tells clients to reload
+ROSTER_CHANGE_LOG = 1000
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+TEAM_FIELDS = ('id', 'name', 'rotation_schedule', 'timezone', 'members')
+# Name prefix ranges only hold under code point order. SQLite compares that way
+# by default; elsewhere the bounds are compared under a binary collation.
+BINARY_COLLATIONS = {'postgresql': 'C', 'mysql': 'utf8mb4_bin'}
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+def roster_version():
+    # (epoch, version) as committed by any process
+    row = db.session.query(RosterVersion.epoch, RosterVersion.version).filter(RosterVersion.id == 1).first()
+    return (row.epoch, row.version) if row else ('0', 0)
+
+def ensure_roster_version():
+    if db.session.get(RosterVersion, 1) is None:
+        db.session.add(RosterVersion(id=1, epoch=os.urandom(4).hex(), version=0))
+        db.session.commit()
+
+def roster_etag(key, version):
+    # The key is part of the tag so different views of one URL never validate each other
+    parts = key if isinstance(key, tuple) else (key,)
+    return '-'.join([str(part) for part in version] + [str(part) for part in parts])
+
+def bump_roster_version(changed=(), deleted=()):
+    # Call in the transaction making the change, before it commits. The UPDATE
+    # holds the row lock until then, so versions commit in order.
+    bumped = db.session.execute(
+        update(RosterVersion).where(RosterVersion.id == 1).values(version=RosterVersion.version + 1)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    if not bumped:
+        db.session.execute(insert(RosterVersion).values(id=1, epoch=os.urandom(4).hex(), version=1))
+    version = db.session.query(RosterVersion.version).filter(RosterVersion.id == 1).scalar()
+    db.session.execute(insert(RosterChange).values(
+        version=version, changed=json.dumps(sorted(set(changed))), deleted=json.dumps(sorted(set(deleted)))))
+    if version % 100 == 0:
+        db.session.execute(delete(RosterChange).where(RosterChange.version <= version - ROSTER_CHANGE_LOG))
+    return version
+
+def cached_roster_body(key, version, build):
+    # build() returns serialized bytes or None if missing. Read the version
+    # before building, so a body is never older than the version it is cached as.
+    cached = _response_cache.get(key)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+    body = build()
+    if body is not None:
+        if len(_response_cache) >= RESPONSE_CACHE_ENTRIES:
+            _response_cache.clear()
+        _response_cache[key] = (version, body)
+    return body
+
+def publish_roster_changes(since):
+    # Push the changes committed after version `since` to this process's stream
+    # subscribers, as one diff. Returns the version published up to.
+    _, version = roster_version()
+    if version <= since:
+        return version
+    rows = db.session.query(RosterChange.changed, RosterChange.deleted) \
+        .filter(RosterChange.version > since, RosterChange.version <= version) \
+        .order_by(RosterChange.version) \
+        .all()
+    if len(rows) < version - since:
+        # Part of the log was pruned already
+        roster_hub.publish('reload', {'version': version})
+        return version
+    changed, deleted = set(), set()
+    for row in rows:
+        for team_id in json.loads(row.changed):
+            changed.add(team_id)
+            deleted.discard(team_id)
+        for team_id in json.loads(row.deleted):
+            deleted.add(team_id)
+            changed.discard(team_id)
+    if changed or deleted:
+        # The diff is serialized once for all streams
+        roster_hub.publish('roster', {
+            'version': version,
+            'teams': load_roster(team_ids=sorted(changed)) if changed else [],
+            'deleted': sorted(deleted)
+        })
+    return version
+
+def watch_roster(app, since):
+    # Called for every new stream subscriber; runs one watcher per process
+    # while it has any
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = threading.Thread(target=_watch_roster, args=(app, since), name='roster-watcher', daemon=True)
+            _watcher.start()
+
+def _watch_roster(app, since):
+    global _watcher
+    while True:
+        time.sleep(app.config['ROSTER_POLL_SECONDS'])
+        with _watcher_lock:
+            if not roster_hub.has_subscribers():
+                _watcher = None
+                return
+        try:
+            with app.app_context():
+                since = publish_roster_changes(since)
+        except Exception as e:
+            logger.error(f"Error publishing roster changes: {str(e)}")
+
+def rotated(members, offset):
+    if not members:
+        return members
+    shift = (offset or 0) % len(members)
+    return members[shift:] + members[:shift]
+
+def _member_dicts(member_rows, offset):
+    return [
+        {'id': member.id, 'name': member.name, 'position': position}
+        for position, member in enumerate(rotated(member_rows, offset), start=1)
+    ]
+
+def _team_dict(team_row, members):
+    return {
+        'id': team_row.id,
+        'name': team_row.name,
+        'rotation_schedule': team_row.rotation_schedule,
+        'timezone': team_row.timezone,
+        'members': _member_dicts(members, team_row.rotation_offset)
+    }
+
+def load_roster(team_id=None, team_ids=None):
+    team_query = db.session.query(Team.id, Team.name, Team.rotation_schedule, Team.timezone, Team.rotation_offset) \
+        .order_by(Team.name)
+    member_query = db.session.query(Member.id, Member.name, Member.team_id) \
+        .order_by(Member.team_id, Member.position)
+    if team_id is not None:
+        team_query = team_query.filter(Team.id == team_id)
+        member_query = member_query.filter(Member.team_id == team_id)
+    elif team_ids is not None:
+        team_query = team_query.filter(Team.id.in_(team_ids))
+        member_query = member_query.filter(Member.team_id.in_(team_ids))
+
+    team_rows = team_query.all()
+    if not team_rows:
+        return []
+
+    members_by_team = {row.id: [] for row in team_rows}
+    for member in member_query:
+        bucket = members_by_team.get(member.team_id)
+        if bucket is not None:
+            bucket.append(member)
+
+    return [_team_dict(row, members_by_team[row.id]) for row in team_rows]
+
+def encode_cursor(name):
+    return base64.urlsafe_b64encode(name.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    # Raises ValueError for anything that isn't a cursor we handed out
+    try:
+        return base64.b64decode(cursor + '=' * (-len(cursor) % 4), altchars=b'-_', validate=True).decode()
+    except (UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f'Invalid cursor: {cursor}') from e
+
+def _prefix_end(prefix):
+    # Smallest string above every string starting with prefix, or None if no
+    # string is (the prefix is all U+10FFFF)
+    prefix = prefix.rstrip(chr(sys.maxunicode))
+    if not prefix:
+        return None
+    following = ord(prefix[-1]) + 1
+    if 0xD800 <= following <= 0xDFFF:
+        # Surrogates can't be encoded; the next character is U+E000
+        following = 0xE000
+    return prefix[:-1] + chr(following)
+
+def _binary(column):
+    collation = BINARY_COLLATIONS.get(db.engine.dialect.name)
+    return column.collate(collation) if collation else column
+
+def load_roster_page(limit, after=None, prefix=None, fields=TEAM_FIELDS):
+    # Keyset page of teams ordered by name (names are unique, so the name is the
+    # cursor). The cursor is a range condition on the unique name index, so a page
+    # costs the same wherever it is in the list. So is the prefix on SQLite; on
+    # Postgres it is only index-backed with an index on name COLLATE "C". Members
+    # are loaded only when requested, and only for the teams on the page.
+    team_query = db.session.query(Team.id, Team.name, Team.rotation_schedule, Team.timezone, Team.rotation_offset) \
+        .order_by(Team.name)
+    if prefix:
+        name = _binary(Team.name)
+        end = _prefix_end(prefix)
+        team_query = team_query.filter(name >= prefix, name < end) if end else team_query.filter(name >= prefix)
+    if after is not None:
+        team_query = team_query.filter(Team.name > after)
+    team_rows = team_query.limit(limit + 1).all()
+    next_cursor = encode_cursor(team_rows[limit - 1].name) if len(team_rows) > limit else None
+    team_rows = team_rows[:limit]
+
+    members_by_team = {row.id: [] for row in team_rows}
+    if 'members' in fields and team_rows:
+        for member in db.session.query(Member.id, Member.name, Member.team_id) \
+                .filter(Member.team_id.in_(list(members_by_team))) \
+                .order_by(Member.team_id, Member.position):
+            members_by_team[member.team_id].append(member)
+
+    teams = []
+    for row in team_rows:
+        team = _team_dict(row, members_by_team[row.id])
+        teams.append({field: team[field] for field in fields})
+    return {'teams': teams, 'next_cursor': next_cursor}
+
+def load_team_roster(team_id):
+    roster = load_roster(team_id)
+    return roster[0] if roster else None
+
+def load_team_members(team_id, limit=None):
+    offset = db.session.query(Team.rotation_offset).filter(Team.id == team_id).scalar()
+    if offset is None:
+        return None
+    member_rows = db.session.query(Member.id, Member.name) \
+        .filter(Member.team_id == team_id) \
+        .order_by(Member.position) \
+        .all()
+    members = _member_dicts(member_rows, offset)
+    return members[:limit] if limit is not None else members
+
+def effective_positions(team_ids=None):
+    # Members ranked by stored order with their team size, and the SQL expression for
+    # their effective position once the team's offset is applied (join against Team)
+    ranked = db.session.query(
+        Member.id.label('member_id'),
+        Member.name.label('member_name'),
+        Member.team_id.label('team_id'),
+        func.row_number().over(partition_by=Member.team_id, order_by=Member.position).label('rank'),
+        func.count().over(partition_by=Member.team_id).label('size')
+    )
+    if team_ids is not None:
+        ranked = ranked.filter(Member.team_id.in_(team_ids))
+    ranked = ranked.subquery()
+    position = (ranked.c.rank - 1 + ranked.c.size - Team.rotation_offset % ranked.c.size) % ranked.c.size + 1
+    return ranked, position
+
+def load_dashboard(top):
+    # First `top` members of every team in effective order, from one windowed query
+    ranked, position = effective_positions()
+    rows = db.session.query(Team.id, Team.name, ranked.c.member_id, ranked.c.member_name, position.label('position')) \
+        .outerjoin(ranked, and_(ranked.c.team_id == Team.id, position <= top)) \
+        .order_by(Team.name, Team.id, position)
+
+    dashboard = []
+    for row in rows:
+        if not dashboard or dashboard[-1]['id'] != row.id:
+            dashboard.append({'id': row.id, 'name': row.name, 'members': []})
+        if row.member_id is not None:
+            dashboard[-1]['members'].append({'id': row.member_id, 'name': row.member_name, 'position': row.position})
+    return dashboard
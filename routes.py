@@ -1,11 +1,97 @@
-from flask import Blueprint, jsonify, request, render_template, redirect, url_for, current_app
+import gzip
+import hashlib
+import queue
+from flask import (Blueprint, jsonify, request, render_template, redirect, url_for, current_app, abort, Response,
+                   stream_with_context)
 from flask_login import login_user, login_required, logout_user, current_user
 from werkzeug.security import check_password_hash
+from sqlalchemy.exc import IntegrityError
 from models import db, User, Team, Member
-from utils import update_rotation_schedule, manual_rotate_shifts, check_scheduler_state, check_scheduled_jobs
+from auth import login_throttled
+from roster import (load_roster, load_team_roster, load_team_members, load_dashboard, load_roster_page, decode_cursor,
+                    roster_etag, roster_version, bump_roster_version, cached_roster_body, watch_roster,
+                    TEAM_FIELDS, DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE)
+from events import roster_hub
+from metrics import render_metrics
+from forecast import forecast_window, load_forecast_teams, forecast_json, forecast_ics
+from bulk import parse_json_roster, parse_csv_roster, import_roster, export_roster_json, export_roster_csv
+from positions import fold_rotation_offset, remove_member, reorder_members as set_member_order
+from history import record_on_shift, record_team_deleted, on_shift_at
+from utils import (update_rotation_schedule, manual_rotate_shifts, rotate_teams, check_scheduler_state, check_scheduled_jobs,
+                   db_now, parse_local_time)
+from timezones import DEFAULT_TIMEZONE, zone_table
 
 bp = Blueprint('main', __name__)
 
+STREAM_KEEPALIVE_SECONDS = 25
+STREAM_RETRY_SECONDS = 300
+DEFAULT_DASHBOARD_TOP = 3
+MAX_DASHBOARD_TOP = 50
+# Any of these switches GET /api/teams from the full list to a page
+TEAM_PAGE_ARGS = ('limit', 'cursor', 'q', 'fields')
+
+def roster_response(key, load):
+    # Gzip is negotiated up front so each encoding gets its own ETag and cache entry;
+    # either way the body is built and compressed once per roster version
+    compressed = bool(request.accept_encodings['gzip'])
+    if compressed:
+        key = (key if isinstance(key, tuple) else (key,)) + ('gz',)
+    # Revalidations cost one primary-key read of the version, whichever process made the change
+    version = roster_version()
+    etag = roster_etag(key, version)
+    if etag in request.if_none_match:
+        response = current_app.response_class(status=304)
+    else:
+        def build():
+            payload = load()
+            if payload is None:
+                return None
+            body = current_app.json.dumps(payload).encode() + b'\n'
+            return gzip.compress(body, compresslevel=6, mtime=0) if compressed else body
+        body = cached_roster_body(key, version, build)
+        if body is None:
+            abort(404)
+        response = current_app.response_class(body, mimetype='application/json')
+        if compressed:
+            response.headers['Content-Encoding'] = 'gzip'
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
+def valid_timezone(zone):
+    if not isinstance(zone, str):
+        return False
+    try:
+        zone_table(zone)
+    except ValueError:
+        return False
+    return True
+
+def team_page_response():
+    # ?limit=&cursor=&q=&fields= return one page as {"teams": [...], "next_cursor": ...}
+    limit = request.args.get('limit', DEFAULT_PAGE_SIZE, type=int)
+    if limit < 1 or limit > MAX_PAGE_SIZE:
+        return jsonify({'error': f'limit must be between 1 and {MAX_PAGE_SIZE}'}), 400
+    cursor = request.args.get('cursor')
+    try:
+        after = decode_cursor(cursor) if cursor else None
+    except ValueError:
+        return jsonify({'error': 'Invalid cursor'}), 400
+    requested = request.args.get('fields')
+    fields = TEAM_FIELDS
+    if requested:
+        names = {name.strip() for name in requested.split(',') if name.strip()}
+        unknown = names.difference(TEAM_FIELDS)
+        if unknown or not names:
+            return jsonify({'error': f"fields must be a comma-separated subset of {', '.join(TEAM_FIELDS)}"}), 400
+        fields = tuple(field for field in TEAM_FIELDS if field in names)
+    prefix = request.args.get('q') or None
+
+    # Cursors and search terms are free text; keep them out of the ETag
+    query_key = hashlib.sha1(repr((limit, after, prefix, fields)).encode()).hexdigest()[:16]
+    return roster_response(('teams', query_key), lambda: load_roster_page(limit, after, prefix, fields))
+
 @bp.route('/')
 def index():
     return render_template('index.html')
@@ -13,6 +99,11 @@ def index():
 @bp.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
+        retry_after = login_throttled()
+        if retry_after:
+            response = jsonify({'success': False, 'message': 'Too many login attempts, try again later'})
+            response.headers['Retry-After'] = str(retry_after)
+            return response, 429
         username = request.form.get('username')
         password = request.form.get('password')
         user = User.query.filter_by(username=username).first()
@@ -43,39 +134,27 @@ def teams():
         data = request.json
         if not data or 'name' not in data:
             return jsonify({'error': 'Team name is required'}), 400
-        new_team = Team(name=data['name'], rotation_schedule=data.get('rotation_schedule'))
+        zone = data.get('timezone') or DEFAULT_TIMEZONE
+        if not valid_timezone(zone):
+            return jsonify({'error': f'Unknown timezone: {zone}'}), 400
+        new_team = Team(name=data['name'], rotation_schedule=data.get('rotation_schedule'), timezone=zone)
         db.session.add(new_team)
+        db.session.flush()
+        bump_roster_version(changed=[new_team.id])
         db.session.commit()
         update_rotation_schedule(new_team.id)
         return jsonify({'message': 'Team created successfully', 'id': new_team.id}), 201
+    elif any(name in request.args for name in TEAM_PAGE_ARGS):
+        return team_page_response()
     else:
-        teams = Team.query.order_by(Team.name).all()
-        return jsonify([{
-            'id': team.id, 
-            'name': team.name, 
-            'rotation_schedule': team.rotation_schedule,
-            'members': [{
-                'id': member.id,
-                'name': member.name,
-                'position': member.position
-            } for member in team.members.order_by(Member.position)]
-        } for team in teams])
+        return roster_response('teams', load_roster)
 
 @bp.route('/api/teams/<int:team_id>', methods=['GET', 'PUT', 'DELETE'])
 def team(team_id):
-    team = Team.query.get_or_404(team_id)
-    
     if request.method == 'GET':
-        return jsonify({
-            'id': team.id, 
-            'name': team.name, 
-            'rotation_schedule': team.rotation_schedule,
-            'members': [{
-                'id': member.id,
-                'name': member.name,
-                'position': member.position
-            } for member in team.members.order_by(Member.position)]
-        })
+        return roster_response(('team', team_id), lambda: load_team_roster(team_id))
+    
+    team = Team.query.get_or_404(team_id)
     
     if not current_user.is_authenticated:
         return jsonify({'error': 'Authentication required for this action'}), 401
@@ -84,86 +163,192 @@ def team(team_id):
         data = request.json
         if not data:
             return jsonify({'error': 'No data provided'}), 400
+        zone = data.get('timezone') or team.timezone
+        if not valid_timezone(zone):
+            return jsonify({'error': f'Unknown timezone: {zone}'}), 400
+        old_schedule = (team.rotation_schedule, team.timezone)
         team.name = data.get('name', team.name)
         team.rotation_schedule = data.get('rotation_schedule', team.rotation_schedule)
+        team.timezone = zone
+        bump_roster_version(changed=[team.id])
         db.session.commit()
-        update_rotation_schedule(team.id)
+        if (team.rotation_schedule, team.timezone) != old_schedule:
+            update_rotation_schedule(team.id)
         return jsonify({'message': 'Team updated successfully'})
     
     if request.method == 'DELETE':
         db.session.delete(team)
+        record_team_deleted(team_id, db_now())
+        bump_roster_version(deleted=[team_id])
         db.session.commit()
+        update_rotation_schedule(team_id)
         return jsonify({'message': 'Team deleted successfully'})
 
 @bp.route('/api/teams/<int:team_id>/members', methods=['GET', 'POST'])
 def team_members(team_id):
-    team = Team.query.get_or_404(team_id)
-    
     if request.method == 'POST':
+        Team.query.get_or_404(team_id)
         if not current_user.is_authenticated:
             return jsonify({'error': 'Authentication required for this action'}), 401
         data = request.json
         if not data or 'name' not in data:
             return jsonify({'error': 'Member name is required'}), 400
-        new_member = Member(
-            name=data['name'],
-            team_id=team_id,
-            position=len(team.members.all()) + 1
-        )
-        db.session.add(new_member)
-        db.session.commit()
+        try:
+            new_member = Member(
+                name=data['name'],
+                team_id=team_id,
+                position=fold_rotation_offset(team_id) + 1
+            )
+            db.session.add(new_member)
+            record_on_shift([team_id], 'add', db_now())
+            bump_roster_version(changed=[team_id])
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()
+            return jsonify({'error': 'The team was changed concurrently, please retry'}), 409
         return jsonify({'message': 'Member added successfully', 'id': new_member.id}), 201
     else:
-        if request.referrer and 'admin' in request.referrer:
-            members = Member.query.filter_by(team_id=team_id).order_by(Member.position).all()
-        else:
-            members = Member.query.filter_by(team_id=team_id).order_by(Member.position).limit(3).all()
-        return jsonify([{'id': member.id, 'name': member.name, 'position': member.position} for member in members])
+        # Callers that only show who is on shift ask for ?top=K; default is the full list
+        top = request.args.get('top', type=int)
+        if top is not None and top < 1:
+            return jsonify({'error': 'top must be a positive integer'}), 400
+        return roster_response(('members', team_id, top), lambda: load_team_members(team_id, limit=top))
+
+@bp.route('/api/dashboard')
+def dashboard():
+    top = request.args.get('top', DEFAULT_DASHBOARD_TOP, type=int)
+    if top < 1 or top > MAX_DASHBOARD_TOP:
+        return jsonify({'error': f'top must be between 1 and {MAX_DASHBOARD_TOP}'}), 400
+    return roster_response(('dashboard', top), lambda: load_dashboard(top))
+
+def forecast_response(team_id=None):
+    teams = load_forecast_teams(team_id)
+    if team_id is not None and not teams:
+        abort(404)
+    # Naive from/to are read in the team's timezone, or the default one across teams
+    zone = teams[0][0]['timezone'] if team_id is not None else DEFAULT_TIMEZONE
+    try:
+        start, end = forecast_window(parse_local_time(request.args.get('from'), zone),
+                                     parse_local_time(request.args.get('to'), zone))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    if request.args.get('format', 'json') == 'ics':
+        return Response(forecast_ics(teams, start, end), mimetype='text/calendar')
+    return Response(forecast_json(teams, start, end, single=team_id is not None), mimetype='application/json')
+
+@bp.route('/api/teams/<int:team_id>/forecast')
+def team_forecast(team_id):
+    return forecast_response(team_id)
+
+@bp.route('/api/forecast')
+def forecast():
+    return forecast_response()
+
+@bp.route('/api/teams/<int:team_id>/on-shift')
+def team_on_shift(team_id):
+    # Who was on shift at ?at= (default now), from the rotation history. History
+    # outlives the team, so deleted teams fall back to the default timezone.
+    zone = db.session.query(Team.timezone).filter(Team.id == team_id).scalar() or DEFAULT_TIMEZONE
+    try:
+        at = parse_local_time(request.args.get('at'), zone) or db_now()
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    event = on_shift_at(team_id, at)
+    if event is None:
+        return jsonify({'error': 'No rotation history for this team at that time'}), 404
+    table = zone_table(zone)
+    return jsonify({
+        'team_id': team_id,
+        'at': table.to_aware(at).isoformat(),
+        'member': {'id': event.member_id, 'name': event.member_name} if event.member_id is not None else None,
+        'since': table.to_aware(event.occurred_at).isoformat(),
+        'event': event.kind
+    })
+
+@bp.route('/api/stream')
+def stream():
+    subscriber = roster_hub.subscribe(limit=current_app.config['STREAM_MAX_SUBSCRIBERS'])
+    if subscriber is None:
+        # EventSource gives up on an error status, and the dashboard falls back to polling
+        response = jsonify({'error': 'Too many open streams, poll /api/dashboard instead'})
+        response.headers['Retry-After'] = str(STREAM_RETRY_SECONDS)
+        return response, 503
+    # Changes can be committed by any process, so the hub is fed from the database
+    _, version = roster_version()
+    watch_roster(current_app._get_current_object(), version)
+
+    def generate():
+        try:
+            yield f"retry: 5000\nevent: hello\ndata: {{\"version\":{version}}}\n\n".encode()
+            while True:
+                try:
+                    message = subscriber.get(timeout=STREAM_KEEPALIVE_SECONDS)
+                except queue.Empty:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            roster_hub.unsubscribe(subscriber)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
 
 @bp.route('/api/teams/<int:team_id>/members/<int:member_id>/remove', methods=['POST'])
 @login_required
 def remove_member_from_team(team_id, member_id):
-    team = Team.query.get_or_404(team_id)
+    Team.query.get_or_404(team_id)
     member = Member.query.get_or_404(member_id)
     
     if member.team_id != team_id:
         return jsonify({'error': 'Member does not belong to the specified team'}), 400
     
-    db.session.delete(member)
-    db.session.commit()
-    
-    # Reorder remaining members after deletion
-    remaining_members = Member.query.filter_by(team_id=team_id).order_by(Member.position).all()
-    for i, m in enumerate(remaining_members, start=1):
-        m.position = i
-    
-    db.session.commit()
+    try:
+        if not remove_member(team_id, member_id):
+            db.session.rollback()
+            return jsonify({'error': 'The team was changed concurrently, please retry'}), 409
+        record_on_shift([team_id], 'remove', db_now())
+        bump_roster_version(changed=[team_id])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'The team was changed concurrently, please retry'}), 409
     return jsonify({'message': 'Member removed successfully'}), 200
 
 @bp.route('/api/teams/<int:team_id>/members/reorder', methods=['PUT'])
 @login_required
 def reorder_members(team_id):
-    team = Team.query.get_or_404(team_id)
+    Team.query.get_or_404(team_id)
     data = request.json
     if not data or 'order' not in data:
         return jsonify({'error': 'Invalid request data'}), 400
     
-    new_order = data['order']
-    members = {str(m.id): m for m in team.members}
-    
-    # Convert new_order to set of strings for comparison
-    new_order_set = {str(member_id) for member_id in new_order}
-    members_set = set(members.keys())
-    
-    if new_order_set != members_set:
+    try:
+        new_order = [int(member_id) for member_id in data['order']]
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid member IDs in the new order'}), 400
+    member_ids = {member_id for (member_id,) in db.session.query(Member.id).filter(Member.team_id == team_id)}
+    if len(new_order) != len(member_ids) or set(new_order) != member_ids:
         return jsonify({'error': 'Invalid member IDs in the new order'}), 400
     
-    for index, member_id in enumerate(new_order, start=1):
-        members[str(member_id)].position = index
-    
-    db.session.commit()
+    # The new order is the effective order, so the rotation offset starts over
+    try:
+        set_member_order(team_id, new_order)
+        record_on_shift([team_id], 'reorder', db_now())
+        bump_roster_version(changed=[team_id])
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        return jsonify({'error': 'The team was changed concurrently, please retry'}), 409
     return jsonify({'message': 'Member positions updated successfully'}), 200
 
+@bp.route('/metrics')
+def metrics():
+    return Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/check_scheduler')
 @login_required
 def check_scheduler():
@@ -178,4 +363,47 @@ def rotate_team(team_id):
     if success:
         return jsonify({'message': 'Team rotation completed successfully'}), 200
     else:
-        return jsonify({'error': 'Failed to rotate team'}), 500
\ No newline at end of file
+        return jsonify({'error': 'Failed to rotate team'}), 500
+
+@bp.route('/api/rotate', methods=['POST'])
+@login_required
+def rotate_teams_bulk():
+    data = request.json
+    team_ids = data.get('team_ids') if data else None
+    if not isinstance(team_ids, list) or not all(isinstance(team_id, int) for team_id in team_ids):
+        return jsonify({'error': 'team_ids must be a list of team IDs'}), 400
+    rotated = rotate_teams(team_ids)
+    if rotated is None:
+        return jsonify({'error': 'Failed to rotate teams'}), 500
+    return jsonify({
+        'message': f'Rotated {len(rotated)} teams',
+        'rotated': rotated,
+        'skipped': sorted(set(team_ids) - set(rotated))
+    }), 200
+
+@bp.route('/api/import', methods=['POST'])
+@login_required
+def import_teams():
+    try:
+        if request.mimetype == 'text/csv':
+            teams = parse_csv_roster(request.get_data(as_text=True))
+        else:
+            data = request.get_json(silent=True)
+            if data is None:
+                return jsonify({'error': 'Expected a JSON or text/csv body'}), 400
+            teams = parse_json_roster(data)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    summary = import_roster(teams)
+    return jsonify(dict(summary, message='Roster imported successfully')), 200
+
+@bp.route('/api/export')
+@login_required
+def export_teams():
+    if request.args.get('format', 'json') == 'csv':
+        body, mimetype, filename = export_roster_csv(), 'text/csv', 'roster.csv'
+    else:
+        body, mimetype, filename = export_roster_json(), 'application/json', 'roster.json'
+    return Response(stream_with_context(body), mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}'
+    })
\ No newline at end of file
@@ -0,0 +1,159 @@
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from functools import lru_cache
+from croniter import croniter
+
+# Compiled rotation schedules. Each distinct rotation_schedule string is parsed
+# once into field sets; next_after/count_between then work on naive wall-clock
+# datetimes in the team's timezone without touching the cron parser again.
+# next_utc/count_utc take naive UTC instants and a timezones.ZoneTable.
+
+MAX_SEARCH_DAYS = 366 * 8  # long enough to reach the next Feb 29
+
+class CompiledSchedule:
+    def __init__(self, expression):
+        fields = expression.split()
+        if len(fields) != 5:
+            raise ValueError(f"Expected 5 cron fields, got {len(fields)}: {expression!r}")
+        self.expression = expression
+
+        # '*/2' in the day-of-month field means "every two days from the last
+        # rotation" rather than cron's odd days of the month
+        self.every_other_day = fields[2] == '*/2'
+        if self.every_other_day:
+            fields[2] = '*'
+
+        expanded, nth_weekday = croniter.expand(' '.join(fields))
+        self._croniter_fallback = bool(nth_weekday) or any(
+            not isinstance(value, int) and value != '*' for field in expanded for value in field
+        )
+        if self._croniter_fallback:
+            return
+
+        minutes, hours, days, months, weekdays = expanded
+        self._times = sorted(hour * 60 + minute
+                             for hour in (range(24) if hours == ['*'] else hours)
+                             for minute in (range(60) if minutes == ['*'] else minutes))
+        self._days = None if days == ['*'] else frozenset(days)
+        self._months = None if months == ['*'] else frozenset(months)
+        self._weekdays = None if weekdays == ['*'] else frozenset(weekdays)
+        self._year_prefix = {}
+
+    def _day_matches(self, day):
+        if self._months is not None and day.month not in self._months:
+            return False
+        if self._days is None and self._weekdays is None:
+            return True
+        cron_weekday = day.isoweekday() % 7  # cron counts Sunday as 0
+        if self._days is not None and self._weekdays is not None:
+            # Standard cron: restricted day-of-month and day-of-week are OR-ed
+            return day.day in self._days or cron_weekday in self._weekdays
+        if self._days is not None:
+            return day.day in self._days
+        return cron_weekday in self._weekdays
+
+    def _at_first_time(self, t):
+        first = self._times[0] if not self._croniter_fallback else 0
+        return t.replace(hour=first // 60, minute=first % 60, second=0, microsecond=0)
+
+    def next_after(self, t):
+        # First scheduled minute strictly after t
+        if self.every_other_day:
+            candidate = self._at_first_time(t)
+            if candidate <= t:
+                candidate += timedelta(days=2)
+            return candidate
+
+        if self._croniter_fallback:
+            return croniter(self.expression, t).get_next(datetime)
+
+        candidate = t.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = candidate.date()
+        index = bisect_left(self._times, candidate.hour * 60 + candidate.minute)
+        for _ in range(MAX_SEARCH_DAYS):
+            if index < len(self._times) and self._day_matches(day):
+                minute_of_day = self._times[index]
+                return datetime(day.year, day.month, day.day, minute_of_day // 60, minute_of_day % 60)
+            day += timedelta(days=1)
+            index = 0
+        raise ValueError(f"Schedule {self.expression!r} never fires")
+
+    def _matching_days(self, first, last):
+        # Matching days in [first, last), from per-year prefix sums
+        if self._days is None and self._months is None and self._weekdays is None:
+            return (last - first).days
+        total = 0
+        for year in range(first.year, last.year + 1):
+            prefix = self._year_prefix.get(year)
+            if prefix is None:
+                prefix = [0]
+                day = date(year, 1, 1)
+                while day.year == year:
+                    prefix.append(prefix[-1] + self._day_matches(day))
+                    day += timedelta(days=1)
+                self._year_prefix[year] = prefix
+            lo = first.timetuple().tm_yday - 1 if year == first.year else 0
+            hi = last.timetuple().tm_yday - 1 if year == last.year else len(prefix) - 1
+            total += prefix[hi] - prefix[lo]
+        return total
+
+    def count_between(self, start, end):
+        # Number of scheduled minutes in (start, end], counted per day rather than
+        # stepped through. For '*/2' schedules start anchors the sequence.
+        if end <= start:
+            return 0
+        if self.every_other_day:
+            # Instants fall every two days at the scheduled time of day from
+            # start's date, even if start itself was moved by a DST gap
+            first = self._at_first_time(start)
+            if first > start:
+                return (end - first) // timedelta(days=2) + 1 if end >= first else 0
+            return (end - first) // timedelta(days=2)
+        if self._croniter_fallback:
+            count, t = 0, self.next_after(start)
+            while t <= end:
+                count += 1
+                t = self.next_after(t)
+            return count
+
+        first_day, last_day = start.date(), end.date()
+        after_start = bisect_right(self._times, start.hour * 60 + start.minute)
+        until_end = bisect_right(self._times, end.hour * 60 + end.minute)
+        if first_day == last_day:
+            return until_end - after_start if self._day_matches(first_day) else 0
+        count = len(self._times) * self._matching_days(first_day + timedelta(days=1), last_day)
+        if self._day_matches(first_day):
+            count += len(self._times) - after_start
+        if self._day_matches(last_day):
+            count += until_end
+        return count
+
+    def next_after_from(self, anchor, t):
+        # First scheduled minute after t in the sequence of rotations starting at anchor;
+        # only '*/2' schedules depend on where the sequence started
+        if self.every_other_day and t >= anchor:
+            first = self._at_first_time(anchor)
+            if first > t:
+                return first
+            return first + timedelta(days=2) * ((t - first) // timedelta(days=2) + 1)
+        return self.next_after(t)
+
+    def next_utc(self, table, after, anchor=None):
+        # First rotation strictly after the UTC instant `after`, reading the
+        # schedule in table's timezone; anchor is where a '*/2' sequence started
+        t = table.to_local(after)
+        local = self.next_after(t) if anchor is None else self.next_after_from(table.to_local(anchor), t)
+        instant = table.to_utc(local)
+        while instant <= after:
+            # Wall-clock time already used in the first pass through a repeated hour
+            local = self.next_after(local)
+            instant = table.to_utc(local)
+        return instant
+
+    def count_utc(self, table, start, end):
+        # Rotations in (start, end] between UTC instants, counted in local time
+        return self.count_between(table.to_local(start), table.to_local(end))
+
+@lru_cache(maxsize=1024)
+def compile_schedule(expression):
+    return CompiledSchedule(expression)
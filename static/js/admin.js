@@ -1,5 +1,11 @@
+// Teams are listed a page at a time, names only; members load per team on demand
+const TEAM_PAGE_SIZE = 100;
+const TEAM_SEARCH_DELAY_MS = 250;
+let teamCursor = null;
+
 document.addEventListener("DOMContentLoaded", function () {
     fetchTeams();
+    setupTeamSearch();
     setupAddTeamForm();
     setupLoginForm();
     setupAddMemberForm();
@@ -89,6 +95,7 @@ function setupAddTeamForm() {
         e.preventDefault();
         const teamName = document.getElementById("team-name").value;
         const rotationSchedule = rotationScheduleInput.value;
+        const timezone = document.getElementById("team-timezone").value.trim();
 
         if (!validateCronExpression(rotationSchedule)) {
             showNotification("Please enter a valid cron expression", "error");
@@ -103,6 +110,7 @@ function setupAddTeamForm() {
             body: JSON.stringify({
                 name: teamName,
                 rotation_schedule: rotationSchedule,
+                timezone: timezone || undefined,
             }),
         })
             .then((response) => {
@@ -184,8 +192,8 @@ function debounce(func, wait) {
 
 const debouncedEditTeam = debounce(editTeam, 300);
 
-function setupEditTeamButtons() {
-    const editButtons = document.querySelectorAll(".edit-team");
+function setupEditTeamButtons(root = document) {
+    const editButtons = root.querySelectorAll(".edit-team");
     editButtons.forEach((button) => {
         button.addEventListener("click", function (e) {
             e.stopPropagation();
@@ -224,6 +232,7 @@ function editTeam(teamId) {
             editForm.innerHTML = `
                 <input type="text" id="edit-team-name" value="${team.name}" required>
                 <input type="text" id="edit-team-rotation-schedule" value="${team.rotation_schedule || ""}" placeholder="Rotation Schedule (e.g. 0 9 * * */2)" required>
+                <input type="text" id="edit-team-timezone" value="${team.timezone || ""}" placeholder="Timezone (e.g. Europe/Moscow)">
                 <button type="submit" class="bg-green-500 text-white py-1 px-2 rounded text-sm hover:bg-green-600 transition duration-300">Save Changes</button>
                 <button type="button" class="bg-gray-500 text-white py-1 px-2 rounded text-sm hover:bg-gray-600 transition duration-300 cancel-edit">Cancel</button>
             `;
@@ -269,15 +278,37 @@ function editTeam(teamId) {
         });
 }
 
-function fetchTeams() {
-    fetch("/api/teams")
+function setupTeamSearch() {
+    let timer = null;
+    document.getElementById("team-search").addEventListener("input", function () {
+        clearTimeout(timer);
+        timer = setTimeout(() => fetchTeams(), TEAM_SEARCH_DELAY_MS);
+    });
+    document.getElementById("load-more-teams").addEventListener("click", function () {
+        fetchTeams(true);
+    });
+}
+
+function fetchTeams(append = false) {
+    const params = new URLSearchParams({ limit: TEAM_PAGE_SIZE, fields: "id,name" });
+    const search = document.getElementById("team-search").value.trim();
+    if (search) {
+        params.set("q", search);
+    }
+    if (append && teamCursor) {
+        params.set("cursor", teamCursor);
+    }
+    fetch(`/api/teams?${params}`)
         .then((response) => response.json())
-        .then((teams) => {
+        .then((page) => {
             const teamList = document.getElementById("team-list");
             const teamSelect = document.getElementById("team-select");
-            teamList.innerHTML = "";
-            teamSelect.innerHTML = '<option value="">Select Team</option>';
-            teams.forEach((team) => {
+            if (!append) {
+                teamList.innerHTML = "";
+                teamSelect.innerHTML = '<option value="">Select Team</option>';
+            }
+            const items = document.createDocumentFragment();
+            page.teams.forEach((team) => {
                 const li = document.createElement("li");
                 li.innerHTML = `
                     <div class="flex justify-between items-center w-full">
@@ -288,15 +319,21 @@ function fetchTeams() {
                         </div>
                     </div>
                 `;
-                teamList.appendChild(li);
+                items.appendChild(li);
 
                 const option = document.createElement("option");
                 option.value = team.id;
                 option.textContent = team.name;
                 teamSelect.appendChild(option);
             });
-            setupDeleteTeamButtons();
-            setupEditTeamButtons();
+            // Wire up only the new rows so earlier pages don't get duplicate handlers
+            setupDeleteTeamButtons(items);
+            setupEditTeamButtons(items);
+            teamList.appendChild(items);
+            teamCursor = page.next_cursor;
+            document
+                .getElementById("load-more-teams")
+                .classList.toggle("hidden", !teamCursor);
         })
         .catch((error) => {
             console.error("Error fetching teams:", error);
@@ -307,8 +344,8 @@ function fetchTeams() {
         });
 }
 
-function setupDeleteTeamButtons() {
-    const deleteButtons = document.querySelectorAll(".delete-team");
+function setupDeleteTeamButtons(root = document) {
+    const deleteButtons = root.querySelectorAll(".delete-team");
     deleteButtons.forEach((button) => {
         button.addEventListener("click", function () {
             const teamId = this.getAttribute("data-team-id");
@@ -372,6 +409,7 @@ function updateTeam(teamId, form) {
     const rotationSchedule = form.querySelector(
         "#edit-team-rotation-schedule",
     ).value;
+    const timezone = form.querySelector("#edit-team-timezone").value.trim();
 
     if (!validateCronExpression(rotationSchedule)) {
         showNotification("Please enter a valid cron expression", "error");
@@ -390,6 +428,7 @@ function updateTeam(teamId, form) {
         body: JSON.stringify({
             name: name,
             rotation_schedule: rotationSchedule,
+            timezone: timezone || undefined,
         }),
     })
         .then((response) => {
@@ -1,10 +1,15 @@
+const VISIBLE_MEMBERS = 3;
+const POLL_INTERVAL = 60000; // Fallback refresh every 60 seconds
+const STREAM_RETRY_INTERVAL = 300000; // Retry a refused stream every 5 minutes
+let pollTimer = null;
+
 document.addEventListener('DOMContentLoaded', function() {
     fetchTeams();
-    startTeamMemberRefresh();
+    subscribeToRosterChanges();
 });
 
 function fetchTeams() {
-    fetch('/api/teams', { credentials: 'include' })
+    fetch(`/api/dashboard?top=${VISIBLE_MEMBERS}`, { credentials: 'include' })
         .then(response => response.json())
         .then(teams => {
             const teamsContainer = document.getElementById('teams-container');
@@ -25,44 +30,84 @@ function createTeamElement(team) {
         <h2 class="team-name">${team.name}</h2>
         <ul class="member-list space-y-2" id="team-${team.id}-members"></ul>
     `;
-    fetchTeamMembers(team.id, teamDiv.querySelector(`#team-${team.id}-members`));
+    renderMembers(team.members.slice(0, VISIBLE_MEMBERS), teamDiv.querySelector(`#team-${team.id}-members`));
     return teamDiv;
 }
 
-function fetchTeamMembers(teamId, memberListElement) {
-    fetch(`/api/teams/${teamId}/members`, { credentials: 'include' })
-        .then(response => {
-            if (!response.ok) {
-                throw new Error('Network response was not ok');
-            }
-            return response.json();
-        })
-        .then(members => {
-            memberListElement.innerHTML = '';
-            members.forEach(member => {
-                const memberItem = document.createElement('li');
-                memberItem.className = 'member-item';
-                memberItem.innerHTML = `
-                    <span class="font-semibold">${member.name}</span>
-                `;
-                memberListElement.appendChild(memberItem);
-            });
-        })
-        .catch(error => {
-            console.error('Error fetching team members:', error);
-            memberListElement.innerHTML = '<li>Error loading team members. Please try again later.</li>';
-        });
+function renderMembers(members, memberListElement) {
+    memberListElement.innerHTML = '';
+    members.forEach(member => {
+        const memberItem = document.createElement('li');
+        memberItem.className = 'member-item';
+        memberItem.innerHTML = `
+            <span class="font-semibold">${member.name}</span>
+        `;
+        memberListElement.appendChild(memberItem);
+    });
+}
+
+function applyRosterChange(change) {
+    const teamsContainer = document.getElementById('teams-container');
+    let unknownTeam = false;
+    change.teams.forEach(team => {
+        const card = teamsContainer.querySelector(`.team-card[data-team-id="${team.id}"]`);
+        if (!card) {
+            unknownTeam = true;
+            return;
+        }
+        card.querySelector('.team-name').textContent = team.name;
+        renderMembers(team.members.slice(0, VISIBLE_MEMBERS), card.querySelector('.member-list'));
+    });
+    change.deleted.forEach(teamId => {
+        const card = teamsContainer.querySelector(`.team-card[data-team-id="${teamId}"]`);
+        if (card) {
+            card.remove();
+        }
+    });
+    if (unknownTeam) {
+        // New teams need to be placed in name order, so reload the whole grid
+        fetchTeams();
+    }
+}
+
+function subscribeToRosterChanges(connectedBefore = false) {
+    if (!window.EventSource) {
+        startTeamMemberRefresh();
+        return;
+    }
+    const source = new EventSource('/api/stream');
+    source.addEventListener('hello', () => {
+        stopTeamMemberRefresh();
+        if (connectedBefore) {
+            // Changes may have been missed while disconnected
+            fetchTeams();
+        }
+        connectedBefore = true;
+    });
+    source.addEventListener('roster', event => applyRosterChange(JSON.parse(event.data)));
+    // Sent when this page fell too far behind for a diff
+    source.addEventListener('reload', fetchTeams);
+    source.onerror = () => {
+        // The browser keeps reconnecting; poll until the stream is back
+        startTeamMemberRefresh();
+        if (source.readyState === EventSource.CLOSED) {
+            // Refused because the server is at its stream limit; the browser won't retry
+            setTimeout(() => subscribeToRosterChanges(true), STREAM_RETRY_INTERVAL);
+        }
+    };
 }
 
 function startTeamMemberRefresh() {
-    setInterval(() => {
-        const teamContainers = document.querySelectorAll('.team-card');
-        teamContainers.forEach(container => {
-            const teamId = container.getAttribute('data-team-id');
-            const memberList = container.querySelector('.member-list');
-            if (teamId && memberList) {
-                fetchTeamMembers(teamId, memberList);
-            }
-        });
-    }, 60000); // Refresh every 60 seconds
+    if (pollTimer !== null) {
+        return;
+    }
+    // One aggregated request refreshes every card
+    pollTimer = setInterval(fetchTeams, POLL_INTERVAL);
+}
+
+function stopTeamMemberRefresh() {
+    if (pollTimer !== null) {
+        clearInterval(pollTimer);
+        pollTimer = null;
+    }
 }
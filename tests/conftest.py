@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import insert
+from config import Config
+from main import create_app
+from models import db, Team, Member, User
+from roster import bump_roster_version
+
+def seed_teams(app, teams, members):
+    with app.app_context():
+        db.session.execute(insert(Team), [{'name': f'team-{index:04d}', 'rotation_schedule': '0 9 * * 1'}
+                                          for index in range(teams)])
+        team_ids = [team_id for (team_id,) in db.session.query(Team.id).order_by(Team.id)]
+        if members:
+            db.session.execute(insert(Member), [{'name': f'member-{team_id}-{position}', 'team_id': team_id,
+                                                 'position': position}
+                                                for team_id in team_ids for position in range(1, members + 1)])
+        bump_roster_version(changed=team_ids)
+        db.session.commit()
+        return team_ids
+
+def admin_client(app):
+    # Test client logged in as a fresh admin user
+    with app.app_context():
+        user = User(username='admin')
+        user.set_password('secret')
+        db.session.add(user)
+        db.session.commit()
+    client = app.test_client()
+    client.post('/login', data={'username': 'admin', 'password': 'secret'})
+    return client
+
+@pytest.fixture
+def make_app(tmp_path_factory):
+    # Each call returns an app on its own scratch SQLite file, optionally seeded
+    apps = []
+
+    def make(teams=0, members=0):
+        database = tmp_path_factory.mktemp('db') / 'test.db'
+
+        class TestConfig(Config):
+            TESTING = True
+            SECRET_KEY = 'test'
+            SQLALCHEMY_DATABASE_URI = f'sqlite:///{database}'
+            SCHEDULER_ENABLED = False
+            SCHEDULER_JOBSTORE = 'memory'
+
+        app = create_app(TestConfig)
+        with app.app_context():
+            db.create_all()
+        apps.append(app)
+        if teams:
+            seed_teams(app, teams, members)
+        return app
+
+    yield make
+    for app in apps:
+        with app.app_context():
+            for engine in db.engines.values():
+                engine.dispose()
@@ -0,0 +1,17 @@
+from models import User
+from auth import issue_api_token, revoke_api_token
+from conftest import admin_client
+
+def test_revoked_token_is_rejected_at_once(make_app):
+    app = make_app(teams=1, members=2)
+    admin_client(app)
+    with app.app_context():
+        token = issue_api_token(User.query.filter_by(username='admin').one(), 'ci')
+    client = app.test_client()
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.post('/api/teams/1/rotate', headers=headers).status_code == 200
+    # Without a valid token the request is sent to the login page
+    assert client.post('/api/teams/1/rotate', headers={'Authorization': f'Bearer {token}x'}).status_code == 302
+    with app.app_context():
+        assert revoke_api_token(int(token.split('_')[1]))
+    assert client.post('/api/teams/1/rotate', headers=headers).status_code == 302
@@ -0,0 +1,42 @@
+import pytest
+from bulk import parse_json_roster, parse_csv_roster
+from conftest import admin_client
+
+def test_json_roster_is_parsed_in_order():
+    teams = parse_json_roster([
+        {'name': ' Ops ', 'rotation_schedule': '0 9 * * 1', 'timezone': 'Europe/Berlin',
+         'members': ['Alice', {'name': 'Bob'}]},
+        {'name': 'Ops', 'members': ['Carol']}
+    ])
+    assert teams == {'Ops': {'rotation_schedule': '0 9 * * 1', 'timezone': 'Europe/Berlin',
+                             'members': ['Alice', 'Bob', 'Carol']}}
+
+@pytest.mark.parametrize('data, message', [
+    ({'name': 'Ops'}, 'Expected a list'),
+    (['Ops'], 'not an object'),
+    ([{'name': 5}], 'name in entry 1 must be a string'),
+    ([{'name': 'Ops', 'members': 'Alice'}], 'members in entry 1 must be a list'),
+    ([{'name': 'Ops', 'members': [5]}], 'Member names in entry 1 must be strings'),
+    ([{'name': 'Ops', 'members': [{'name': None}]}], 'Member names in entry 1 must be strings'),
+    ([{'name': 'Ops', 'members': ['']}], 'Invalid member name'),
+    ([{'name': 'Ops', 'rotation_schedule': 'nonsense'}], 'Invalid rotation schedule'),
+    ([{'name': 'Ops', 'rotation_schedule': '99 9 * * *'}], 'Invalid rotation schedule'),
+    ([{'name': 'Ops', 'rotation_schedule': '0 0 30 2 *'}], 'Invalid rotation schedule'),
+    ([{'name': 'Ops', 'rotation_schedule': 5}], 'rotation_schedule in entry 1 must be a string'),
+    ([{'name': 'Ops', 'timezone': 'Mars/Base'}], 'Unknown timezone'),
+    ([{'name': 'x' * 65}], 'Team name too long'),
+])
+def test_json_roster_rejects_bad_entries(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_json_roster(data)
+
+def test_csv_roster_validates_schedules():
+    teams = parse_csv_roster('team,rotation_schedule,timezone,member\nOps,0 9 * * 1,,Alice\nOps,,,Bob\n')
+    assert teams['Ops'] == {'rotation_schedule': '0 9 * * 1', 'timezone': None, 'members': ['Alice', 'Bob']}
+    with pytest.raises(ValueError, match='Invalid rotation schedule in entry 2'):
+        parse_csv_roster('team,rotation_schedule,timezone,member\nOps,nonsense,,Alice\n')
+
+def test_import_endpoint_reports_bad_input_as_400(make_app):
+    client = admin_client(make_app())
+    for body in ([{'name': 5}], [{'name': 'Ops', 'members': 'Alice'}], [{'name': 'Ops', 'rotation_schedule': 'x'}]):
+        assert client.post('/api/import', json=body).status_code == 400
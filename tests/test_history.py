@@ -0,0 +1,86 @@
+from datetime import datetime
+from models import db, RotationEvent
+from history import compact_rotation_history, on_shift_at, record_on_shift
+from conftest import admin_client
+
+NOW = datetime(2026, 6, 1)
+RETENTION_DAYS = 30  # cutoff 2026-05-02
+
+# (team, occurred_at, kind, member); ids follow this order
+EVENTS = [
+    (1, datetime(2026, 1, 1), 'rotate', 10),
+    (1, datetime(2026, 2, 1), 'rotate', 11),
+    (1, datetime(2026, 3, 1), 'reorder', 11),   # repeats 11: dropped
+    (1, datetime(2026, 5, 20), 'rotate', 12),
+    (1, datetime(2026, 5, 21), 'add', 12),      # repeats 12: dropped
+    (1, datetime(2026, 5, 22), 'rotate', 13),
+    (2, datetime(2026, 1, 1), 'rotate', 20),
+    (2, datetime(2026, 1, 5), 'delete', None),  # last event before the cutoff: kept
+    (3, datetime(2026, 5, 10), 'rotate', 30),
+    (3, datetime(2026, 5, 11), 'delete', None),
+    (3, datetime(2026, 5, 12), 'import', 30),   # same member, but after a delete: kept
+]
+
+def add_events(app):
+    with app.app_context():
+        for team_id, occurred_at, kind, member_id in EVENTS:
+            db.session.add(RotationEvent(team_id=team_id, occurred_at=occurred_at, kind=kind, member_id=member_id,
+                                         member_name=f'member-{member_id}' if member_id else None))
+        db.session.commit()
+
+def remaining(app):
+    with app.app_context():
+        return [(event.team_id, event.occurred_at, event.member_id)
+                for event in RotationEvent.query.order_by(RotationEvent.id)]
+
+def test_compaction_keeps_changes_and_one_event_before_the_window(make_app):
+    app = make_app()
+    add_events(app)
+    with app.app_context():
+        assert compact_rotation_history(NOW, RETENTION_DAYS) == 4
+    assert remaining(app) == [
+        (1, datetime(2026, 2, 1), 11),
+        (1, datetime(2026, 5, 20), 12),
+        (1, datetime(2026, 5, 22), 13),
+        (2, datetime(2026, 1, 5), None),
+        (3, datetime(2026, 5, 10), 30),
+        (3, datetime(2026, 5, 11), None),
+        (3, datetime(2026, 5, 12), 30),
+    ]
+    # Running it again changes nothing
+    with app.app_context():
+        assert compact_rotation_history(NOW, RETENTION_DAYS) == 0
+
+def test_on_shift_at_returns_the_latest_event_at_or_before(make_app):
+    app = make_app()
+    add_events(app)
+    with app.app_context():
+        assert on_shift_at(1, datetime(2025, 12, 31)) is None
+        assert on_shift_at(1, datetime(2026, 5, 20)).member_id == 12
+        assert on_shift_at(1, datetime(2026, 5, 21, 12)).kind == 'add'
+        assert on_shift_at(2, datetime(2026, 3, 1)).kind == 'delete'
+        compact_rotation_history(NOW, RETENTION_DAYS)
+        # The kept event still answers lookups from before the window
+        assert on_shift_at(1, datetime(2026, 4, 1)).member_id == 11
+        assert on_shift_at(1, datetime(2026, 5, 21, 12)).member_id == 12
+
+def test_on_shift_at_breaks_ties_by_id(make_app):
+    app = make_app()
+    with app.app_context():
+        at = datetime(2026, 5, 1)
+        db.session.add(RotationEvent(team_id=1, occurred_at=at, kind='rotate', member_id=1))
+        db.session.add(RotationEvent(team_id=1, occurred_at=at, kind='reorder', member_id=2))
+        db.session.commit()
+        assert on_shift_at(1, at).member_id == 2
+
+def test_record_on_shift_names_the_first_member_in_effective_order(make_app):
+    app = make_app(teams=2, members=3)
+    client = admin_client(app)
+    assert client.post('/api/teams/1/rotate').status_code == 200
+    with app.app_context():
+        event = RotationEvent.query.filter_by(team_id=1).one()
+        assert (event.kind, event.member_name) == ('rotate', 'member-1-2')
+        record_on_shift([1, 2], 'reorder', datetime(2026, 5, 1))
+        db.session.commit()
+        assert [(event.team_id, event.member_name) for event in RotationEvent.query.filter_by(kind='reorder')
+                .order_by(RotationEvent.team_id)] == [(1, 'member-1-2'), (2, 'member-2-1')]
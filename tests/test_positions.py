@@ -0,0 +1,114 @@
+from sqlalchemy import create_engine, update
+from models import db, Team, Member
+from bulk import import_roster
+from positions import fold_rotation_offset, remove_member, reorder_members
+from roster import load_team_members
+from conftest import admin_client
+
+# Seeded team 1 is member-1-1..member-1-4, called a..d below
+NAMES = dict(zip(('member-1-1', 'member-1-2', 'member-1-3', 'member-1-4'), 'abcd'))
+
+def effective_order(app, team_id=1):
+    with app.app_context():
+        db.session.expire_all()
+        return [NAMES.get(member['name'], member['name']) for member in load_team_members(team_id)]
+
+def stored_positions(app, team_id=1):
+    with app.app_context():
+        return [position for (position,) in db.session.query(Member.position)
+                .filter(Member.team_id == team_id).order_by(Member.position)]
+
+def rotate(app, times, team_id=1):
+    with app.app_context():
+        db.session.execute(update(Team).where(Team.id == team_id)
+                           .values(rotation_offset=Team.rotation_offset + times))
+        db.session.commit()
+
+def member_id(app, name, team_id=1):
+    seeded = {short: full for full, short in NAMES.items()}
+    with app.app_context():
+        return db.session.query(Member.id).filter(Member.team_id == team_id,
+                                                  Member.name == seeded.get(name, name)).scalar()
+
+def remove(app, name):
+    with app.app_context():
+        assert remove_member(1, member_id(app, name))
+        db.session.commit()
+
+def test_remove_before_and_after_the_shift_point_keeps_who_is_on_shift(make_app):
+    # Offset 2: effective order c, d, a, b; a and b sit before the shift point
+    for name, expected in (('a', ['c', 'd', 'b']), ('b', ['c', 'd', 'a']),
+                           ('c', ['d', 'a', 'b']), ('d', ['c', 'a', 'b'])):
+        app = make_app(teams=1, members=4)
+        rotate(app, 2)
+        remove(app, name)
+        assert effective_order(app) == expected, name
+        assert stored_positions(app) == [1, 2, 3]
+
+def test_remove_last_member_of_a_rotated_team(make_app):
+    app = make_app(teams=1, members=1)
+    rotate(app, 3)
+    remove(app, 'a')
+    assert effective_order(app) == []
+    with app.app_context():
+        assert fold_rotation_offset(1) == 0
+        db.session.commit()
+
+def test_remove_uses_the_offset_committed_before_it(make_app):
+    # A rotation committed by another worker after the route looked at the team
+    # must survive the removal (a, b, c, d rotated once, then d removed)
+    app = make_app(teams=1, members=4)
+    client = admin_client(app)
+    d = member_id(app, 'd')
+    with app.app_context():
+        assert db.session.get(Team, 1).rotation_offset == 0
+        other = create_engine(db.engine.url)
+        with other.begin() as connection:
+            connection.execute(update(Team).where(Team.id == 1).values(rotation_offset=1))
+        other.dispose()
+        assert remove_member(1, d)
+        db.session.commit()
+    assert effective_order(app) == ['b', 'c', 'a']
+    # Already gone: nothing is deleted, and the route answers 404
+    with app.app_context():
+        assert not remove_member(1, d)
+        db.session.rollback()
+    assert client.post(f'/api/teams/1/members/{d}/remove').status_code == 404
+
+def test_add_to_a_rotated_team_appends_to_the_effective_order(make_app):
+    app = make_app(teams=1, members=4)
+    client = admin_client(app)
+    rotate(app, 5)
+    assert client.post('/api/teams/1/members', json={'name': 'e'}).status_code == 201
+    assert effective_order(app) == ['b', 'c', 'd', 'a', 'e']
+    assert stored_positions(app) == [1, 2, 3, 4, 5]
+    with app.app_context():
+        assert db.session.get(Team, 1).rotation_offset == 0
+
+def test_reorder_sets_the_effective_order(make_app):
+    app = make_app(teams=1, members=3)
+    rotate(app, 1)
+    with app.app_context():
+        reorder_members(1, [member_id(app, name) for name in 'cab'])
+        db.session.commit()
+    assert effective_order(app) == ['c', 'a', 'b']
+    with app.app_context():
+        assert db.session.get(Team, 1).rotation_offset == 0
+
+def test_empty_reorder_of_a_team_without_members(make_app):
+    app = make_app(teams=1)
+    client = admin_client(app)
+    rotate(app, 2)
+    assert client.put('/api/teams/1/members/reorder', json={'order': []}).status_code == 200
+    with app.app_context():
+        assert db.session.get(Team, 1).rotation_offset == 0
+
+def test_import_into_a_rotated_team_appends_to_the_effective_order(make_app):
+    app = make_app(teams=1, members=4)
+    rotate(app, 1)
+    with app.app_context():
+        name = db.session.get(Team, 1).name
+        import_roster({name: {'rotation_schedule': None, 'timezone': None, 'members': ['e']}})
+        db.session.commit()
+    assert effective_order(app) == ['b', 'c', 'd', 'a', 'e']
+    assert stored_positions(app) == [1, 2, 3, 4, 5]
@@ -0,0 +1,25 @@
+import pytest
+from sqlalchemy import event
+from models import db
+
+def count_statements(app, path):
+    with app.app_context():
+        engine = db.engine
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = app.test_client().get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert response.status_code == 200
+    return len(statements)
+
+@pytest.mark.parametrize('path', ['/api/teams', '/api/teams/1'])
+def test_roster_statements_do_not_grow_with_teams(make_app, path):
+    one = count_statements(make_app(teams=1, members=3), path)
+    many = count_statements(make_app(teams=40, members=3), path)
+    assert one == many
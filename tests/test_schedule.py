@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from croniter import croniter
+from schedule import compile_schedule
+from timezones import zone_table
+
+# America/New_York in 2026: clocks jump 02:00 -> 03:00 on March 8 and fall
+# back 02:00 -> 01:00 on November 1. Instants below are naive UTC.
+NEW_YORK = 'America/New_York'
+
+def test_next_after_agrees_with_croniter():
+    # The compiled field sets must pick the same minutes as the cron parser
+    for expression in ('0 9 * * 1', '*/15 8-17 * * 1-5', '0 0 1 * *', '30 2 * * *', '0 12 13 * 5', '0 0 29 2 *'):
+        schedule = compile_schedule(expression)
+        t = datetime(2026, 1, 1, 0, 7)
+        for _ in range(50):
+            expected = croniter(expression, t).get_next(datetime)
+            assert schedule.next_after(t) == expected, expression
+            t = expected + timedelta(minutes=13)
+
+def test_to_utc_maps_gap_forward_and_fold_to_first_occurrence():
+    table = zone_table(NEW_YORK)
+    assert table.to_utc(datetime(2026, 7, 1, 9, 0)) == datetime(2026, 7, 1, 13, 0)
+    # 02:30 doesn't exist on March 8; it runs as 03:30 EDT
+    assert table.to_utc(datetime(2026, 3, 8, 2, 30)) == datetime(2026, 3, 8, 7, 30)
+    # 01:30 happens twice on November 1; the EDT one comes first
+    assert table.to_utc(datetime(2026, 11, 1, 1, 30)) == datetime(2026, 11, 1, 5, 30)
+
+def test_every_other_day_anchor_in_spring_gap_keeps_time_of_day():
+    schedule = compile_schedule('30 2 */2 * *')
+    table = zone_table(NEW_YORK)
+    # The March 8 rotation ran at 03:30 EDT; later ones are back at 02:30
+    anchor = datetime(2026, 3, 8, 7, 30)
+    assert schedule.next_utc(table, anchor, anchor=anchor) == datetime(2026, 3, 10, 6, 30)
+    assert schedule.next_utc(table, datetime(2026, 3, 11, 0, 0), anchor=anchor) == datetime(2026, 3, 12, 6, 30)
+    # March 10, 12 and 14 at 02:30 EDT
+    assert schedule.count_utc(table, anchor, datetime(2026, 3, 14, 7, 0)) == 3
+
+def test_fold_fires_once():
+    daily = compile_schedule('30 1 * * *')
+    table = zone_table(NEW_YORK)
+    first = daily.next_utc(table, datetime(2026, 11, 1, 5, 0))
+    assert first == datetime(2026, 11, 1, 5, 30)
+    # Not again at 01:30 EST an hour later, but the next day
+    assert daily.next_utc(table, first) == datetime(2026, 11, 2, 6, 30)
+    # Asked from 01:00 EST, inside the repeated hour, after the first 01:30 ran
+    assert daily.next_utc(table, datetime(2026, 11, 1, 6, 0)) == datetime(2026, 11, 2, 6, 30)
+    assert daily.count_utc(table, datetime(2026, 10, 31, 12, 0), datetime(2026, 11, 1, 12, 0)) == 1
+
+    every_other_day = compile_schedule('30 1 */2 * *')
+    anchor = datetime(2026, 10, 30, 5, 30)
+    first = every_other_day.next_utc(table, anchor, anchor=anchor)
+    assert first == datetime(2026, 11, 1, 5, 30)
+    assert every_other_day.next_utc(table, first, anchor=anchor) == datetime(2026, 11, 3, 6, 30)
+
+def test_every_other_day_anchor_before_time_of_day():
+    schedule = compile_schedule('30 9 */2 * *')
+    table = zone_table(NEW_YORK)
+    # Anchored at 07:00 EDT on June 1, before that day's 09:30 rotation
+    anchor = datetime(2026, 6, 1, 11, 0)
+    assert schedule.next_utc(table, anchor, anchor=anchor) == datetime(2026, 6, 1, 13, 30)
+    assert schedule.next_utc(table, datetime(2026, 6, 2, 12, 0), anchor=anchor) == datetime(2026, 6, 3, 13, 30)
+    # June 1, 3 and 5 at 09:30 EDT
+    assert schedule.count_utc(table, anchor, datetime(2026, 6, 5, 14, 0)) == 3
@@ -0,0 +1,101 @@
+from bisect import bisect_right
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
+import pytz
+
+try:
+    from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+except ImportError:  # Python 3.8
+    ZoneInfo = None
+
+# Stored times are naive UTC. Rotation schedules are cron expressions in the
+# team's timezone, so schedule math converts UTC to local wall-clock time and
+# back. Each zone's UTC offsets are tabulated once per year (the transition
+# instants found by bisection), after which a conversion is a bisect over a
+# handful of instants instead of a tzinfo localize call.
+#
+# DST rules, like cron's: a local time skipped by a spring-forward gap maps to
+# the same wall-clock distance after the gap (02:30 becomes 03:30), and a local
+# time repeated by a fall-back fold maps to its first occurrence.
+
+DEFAULT_TIMEZONE = 'Europe/Moscow'
+
+_DAY = timedelta(days=1)
+
+def load_zone(name):
+    # zoneinfo where it has data for the zone, pytz's bundled database otherwise
+    if ZoneInfo is not None:
+        try:
+            return ZoneInfo(name)
+        except (ZoneInfoNotFoundError, ValueError):
+            pass
+    try:
+        return pytz.timezone(name)
+    except pytz.UnknownTimeZoneError as e:
+        raise ValueError(f"Unknown timezone: {name}") from e
+
+def utc_now():
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+class ZoneTable:
+    def __init__(self, name):
+        self.name = name
+        self.zone = load_zone(name)
+        # year -> (offset at the start of the year, transition instants, offsets after them)
+        self._years = {}
+
+    def _offset(self, instant):
+        return instant.replace(tzinfo=timezone.utc).astimezone(self.zone).utcoffset()
+
+    def _year(self, year):
+        table = self._years.get(year)
+        if table is None:
+            start = datetime(year, 1, 1)
+            instants, offsets = [], []
+            previous = self._offset(start)
+            day = start
+            while day.year == year:
+                following = day + _DAY
+                offset = self._offset(following)
+                if offset != previous:
+                    # Bisect the day down to the second the offset changes
+                    lo, hi = day, following
+                    while hi - lo > timedelta(seconds=1):
+                        mid = lo + (hi - lo) // 2
+                        if self._offset(mid) == previous:
+                            lo = mid
+                        else:
+                            hi = mid
+                    instants.append(hi)
+                    offsets.append(offset)
+                    previous = offset
+                day = following
+            table = self._years[year] = (self._offset(start), instants, offsets)
+        return table
+
+    def offset_at(self, instant):
+        start_offset, instants, offsets = self._year(instant.year)
+        index = bisect_right(instants, instant)
+        return offsets[index - 1] if index else start_offset
+
+    def to_local(self, instant):
+        return instant + self.offset_at(instant)
+
+    def to_utc(self, local):
+        # Offsets are well under a day, so the ones in force a day either side
+        # of the wall-clock time are the only candidates
+        before = self.offset_at(local - _DAY)
+        after = self.offset_at(local + _DAY)
+        if before == after:
+            return local - before
+        valid = [local - offset for offset in (before, after) if self.offset_at(local - offset) == offset]
+        return min(valid) if valid else local - before
+
+    def to_aware(self, instant):
+        # Local time with its fixed UTC offset, for display
+        offset = self.offset_at(instant)
+        return (instant + offset).replace(tzinfo=timezone(offset))
+
+@lru_cache(maxsize=None)
+def zone_table(name):
+    return ZoneTable(name)
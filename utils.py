@@ -1,35 +1,60 @@
 import logging
 import json
 import os
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
 from apscheduler.schedulers.background import BackgroundScheduler
-from models import db, Team, Member
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.base import STATE_STOPPED
+from sqlalchemy import func, insert, update, delete
+from models import db, Team, RotationState, RotationEvent
+from roster import bump_roster_version
+from history import record_on_shift, compact_rotation_history
+from lease import acquire_lease
+from metrics import check_duration, rotation_lag, rotation_team_duration, rotations_total, rotation_failures_total
 from flask import current_app
-from croniter import croniter
-from pytz import timezone
+from schedule import compile_schedule
+from timezones import DEFAULT_TIMEZONE, zone_table, utc_now
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
+# The rotation job re-arms itself on every run; keep APScheduler's per-run lines out of INFO
+logging.getLogger('apscheduler').setLevel(logging.WARNING)
 
-moscow_tz = timezone('Europe/Moscow')
-scheduler = BackgroundScheduler(timezone='Europe/Moscow')  # UTC+3 timezone
+# Run dates are passed as aware UTC datetimes; the zone only matters for the cron jobs
+scheduler = BackgroundScheduler(timezone=DEFAULT_TIMEZONE)
 
-# Use /app directory for rotation file to avoid container issues
+# Legacy rotation state file, only read by import_rotation_file
 ROTATIONS_FILE = 'team_rotations.json'
 
+# App used by scheduled jobs. Jobs are persisted by reference, so they can't
+# carry the app object as an argument.
+_scheduler_app = None
+
 def start_scheduler():
+    global _scheduler_app
     logger.info("Starting the scheduler")
     try:
         if not scheduler.running:
+            _scheduler_app = current_app._get_current_object()
+            if _scheduler_app.config.get('SCHEDULER_JOBSTORE') == 'sqlalchemy' and scheduler.state == STATE_STOPPED:
+                # Persist pending jobs in the app database so restarts resume them
+                try:
+                    scheduler.add_jobstore(SQLAlchemyJobStore(engine=db.engine), 'default')
+                except ValueError:
+                    pass  # Already added before a restart
             scheduler.start()
-            # Check rotations every minute
+            # The check_rotations job is armed for the earliest due team only
+            arm_rotation_job(_scheduler_app)
             scheduler.add_job(
-                check_rotations,
+                run_compact_rotation_history,
                 'cron',
-                minute='*',
-                id='check_rotations',
+                hour=3,
+                minute=30,
+                id='compact_rotation_history',
+                name='compact_rotation_history',
                 replace_existing=True,
-                args=[current_app._get_current_object()]  # Pass app object to the job
+                coalesce=True
             )
             logger.info("Scheduler started successfully")
             logger.info(f"Scheduler state: running={scheduler.running}, state={scheduler.state}")
@@ -39,110 +64,176 @@ def start_scheduler():
     except Exception as e:
         logger.error(f"Error starting scheduler: {str(e)}")
 
-def load_rotation_data():
-    if os.path.exists(ROTATIONS_FILE):
-        try:
-            with open(ROTATIONS_FILE, 'r') as f:
-                return json.load(f)
-        except Exception as e:
-            logger.error(f"Error loading rotation data: {str(e)}")
-            return {}
-    return {}
+# Stored times are naive UTC; these convert to and from aware datetimes
+
+def _to_db_time(value):
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+def db_now():
+    return utc_now()
+
+def parse_local_time(value, zone=DEFAULT_TIMEZONE):
+    # ISO date or datetime; naive values are wall-clock times in zone
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(value).replace(microsecond=0)
+    if parsed.tzinfo:
+        return _to_db_time(parsed)
+    return zone_table(zone).to_utc(parsed)
 
-def save_rotation_data(data):
+def _from_db_time(value):
+    return value.replace(tzinfo=timezone.utc)
+
+def import_rotation_file(path=ROTATIONS_FILE):
+    # One-time migration of team_rotations.json into the rotation_state table
+    if not os.path.exists(path) or RotationState.query.first():
+        return 0
     try:
-        # Write to temp file first then move atomically
-        temp_file = f"{ROTATIONS_FILE}.tmp"
-        with open(temp_file, 'w') as f:
-            json.dump(data, f, indent=2)
-        os.replace(temp_file, ROTATIONS_FILE)
+        with open(path, 'r') as f:
+            rotations = json.load(f)
     except Exception as e:
-        logger.error(f"Error saving rotation data: {str(e)}")
+        logger.error(f"Error loading rotation data: {str(e)}")
+        return 0
 
-def get_next_rotation_time(schedule, base_time=None):
-    if base_time is None:
-        base_time = datetime.now()
-    
-    # Ensure base_time is naive before localizing
-    if base_time.tzinfo:
-        base_time = base_time.replace(tzinfo=None)
-    base_time = moscow_tz.localize(base_time)
-        
+    team_ids = {team_id for (team_id,) in db.session.query(Team.id)}
+    # The file holds wall-clock times in the default timezone
+    table = zone_table(DEFAULT_TIMEZONE)
+    imported = 0
+    for team_id, data in rotations.items():
+        if int(team_id) not in team_ids:
+            continue
+        last_rotation = data.get('last_rotation')
+        db.session.add(RotationState(
+            team_id=int(team_id),
+            schedule=data['schedule'],
+            next_rotation=table.to_utc(datetime.strptime(data['next_rotation'], '%Y-%m-%d %H:%M')),
+            last_rotation=table.to_utc(datetime.strptime(last_rotation, '%Y-%m-%d %H:%M')) if last_rotation else None
+        ))
+        imported += 1
+    db.session.commit()
+    logger.info(f"Imported rotation state for {imported} teams from {path}")
+    return imported
+
+def convert_stored_times_to_utc(zone, batch_size=5000):
+    # One-time upgrade: rotation state and history used to be stored as
+    # wall-clock times in the default timezone. The caller commits.
+    table = zone_table(zone)
+    for model, key, columns in ((RotationState, RotationState.team_id,
+                                 (RotationState.next_rotation, RotationState.last_rotation)),
+                                (RotationEvent, RotationEvent.id, (RotationEvent.occurred_at,))):
+        last_key, converted = None, 0
+        while True:
+            query = db.session.query(key, *columns)
+            if last_key is not None:
+                query = query.filter(key > last_key)
+            rows = query.order_by(key).limit(batch_size).all()
+            if not rows:
+                break
+            db.session.execute(update(model), [
+                dict({key.key: row[0]}, **{column.key: table.to_utc(value) if value else None
+                                          for column, value in zip(columns, row[1:])})
+                for row in rows
+            ])
+            last_key = rows[-1][0]
+            converted += len(rows)
+        logger.info(f"Converted {converted} {model.__table__.name} rows from {zone} to UTC")
+
+def _earliest_rotation():
+    next_rotation = db.session.query(func.min(RotationState.next_rotation)).scalar()
+    return _from_db_time(next_rotation) if next_rotation else None
+
+def arm_rotation_job(app, not_before=None):
+    # Sleep until the earliest due rotation instead of polling every minute.
+    # Web processes don't run the scheduler; the scheduler process picks up
+    # their schedule edits when it resyncs.
+    if not scheduler.running:
+        return
+    with app.app_context():
+        run_date = _earliest_rotation()
+    if run_date is not None and not_before is not None:
+        run_date = max(run_date, not_before)
+    resync_at = _from_db_time(db_now()) + timedelta(seconds=app.config.get('SCHEDULER_RESYNC_SECONDS', 60))
+    run_date = resync_at if run_date is None else min(run_date, resync_at)
+    scheduler.add_job(
+        run_check_rotations,
+        'date',
+        run_date=run_date,
+        id='check_rotations',
+        name='check_rotations',
+        replace_existing=True,
+        misfire_grace_time=None,
+        coalesce=True
+    )
+    logger.debug(f"Next rotation check armed for {run_date}")
+
+def get_next_rotation_time(schedule, after=None, zone=DEFAULT_TIMEZONE):
+    # First rotation after `after` (default now) with the schedule read in zone; naive UTC
+    if after is None:
+        after = db_now()
     try:
-        # Convert */2 day format to proper cron format
-        schedule_parts = schedule.split()
-        if schedule_parts[2] == '*/2':
-            # For */2 days, calculate next time manually to ensure 2 day interval
-            next_time = base_time.replace(
-                hour=int(schedule_parts[1]),
-                minute=int(schedule_parts[0]),
-                second=0,
-                microsecond=0
-            ).replace(tzinfo=None)  # Make naive before localizing
-            
-            # If current time is past today's scheduled time, add 2 days
-            if moscow_tz.localize(next_time) <= base_time:
-                next_time += timedelta(days=2)
-            return moscow_tz.localize(next_time)
-        else:
-            schedule_parts[4] = f"{schedule_parts[4]} * *" # Add month and year fields
-            cron_schedule = ' '.join(schedule_parts)
-            
-            # Use naive datetime for croniter
-            naive_base = base_time.replace(tzinfo=None)
-            iter = croniter(cron_schedule, naive_base)
-            next_time = iter.get_next(datetime)
-            
-            # If next time is in the past or too close to current time, get the next occurrence
-            if moscow_tz.localize(next_time) <= base_time or (moscow_tz.localize(next_time) - base_time).total_seconds() < 60:
-                next_time = iter.get_next(datetime)
-                
-            return moscow_tz.localize(next_time)
+        return compile_schedule(schedule).next_utc(zone_table(zone), after)
     except Exception as e:
         logger.error(f"Error calculating next rotation time: {str(e)}")
-        return moscow_tz.localize(base_time.replace(tzinfo=None) + timedelta(days=1))
+        return after + timedelta(days=1)
+
+def sync_rotation_state(team_ids=None):
+    # Bring rotation_state in line with the teams' schedules in one pass and one
+    # commit. Only new teams and teams whose schedule changed get a fresh next
+    # rotation; overdue state of unchanged teams is kept for check_rotations to
+    # catch up. Returns the number of teams whose state changed.
+    teams = db.session.query(Team.id, Team.rotation_schedule, Team.timezone)
+    states = db.session.query(RotationState.team_id, RotationState.schedule, RotationState.timezone)
+    if team_ids is not None:
+        teams = teams.filter(Team.id.in_(team_ids))
+        states = states.filter(RotationState.team_id.in_(team_ids))
+    schedules = {team_id: (schedule, zone) for team_id, schedule, zone in teams}
+    existing = {team_id: (schedule, zone) for team_id, schedule, zone in states}
+
+    current_time = db_now()
+    # Teams sharing a schedule and timezone share their next rotation
+    next_by_schedule = {}
+    inserts, updates = [], []
+    for team_id, (schedule, zone) in schedules.items():
+        if not schedule or existing.get(team_id) == (schedule, zone):
+            continue
+        if (schedule, zone) not in next_by_schedule:
+            next_by_schedule[schedule, zone] = get_next_rotation_time(schedule, current_time, zone)
+        row = {'team_id': team_id, 'schedule': schedule, 'timezone': zone,
+               'next_rotation': next_by_schedule[schedule, zone]}
+        if team_id in existing:
+            updates.append(row)
+        else:
+            row['last_rotation'] = current_time
+            inserts.append(row)
+    stale = [team_id for team_id in existing if not schedules.get(team_id, (None,))[0]]
+
+    if inserts:
+        db.session.execute(insert(RotationState), inserts)
+    if updates:
+        db.session.execute(update(RotationState), updates)
+    if stale:
+        db.session.execute(delete(RotationState).where(RotationState.team_id.in_(stale)))
+    db.session.commit()
+    if inserts or updates or stale:
+        logger.debug(f"Rotation state: {len(inserts)} added, {len(updates)} rescheduled, {len(stale)} removed")
+    return len(inserts) + len(updates) + len(stale)
 
-def update_rotation_schedule(team_id):
-    logger.info(f"Updating rotation schedule for team {team_id}")
+def update_rotation_schedule(*team_ids):
+    logger.debug(f"Updating rotation schedule for teams {list(team_ids)}")
     try:
-        with current_app.app_context():
-            team = Team.query.get(team_id)
-            if team and team.rotation_schedule:
-                rotations = load_rotation_data()
-                current_time = datetime.now()
-                # Ensure current_time is naive
-                if current_time.tzinfo:
-                    current_time = current_time.replace(tzinfo=None)
-                current_time = moscow_tz.localize(current_time)
-                next_rotation = get_next_rotation_time(team.rotation_schedule, current_time)
-                
-                # If team already exists in rotations, preserve the last rotation time
-                last_rotation = current_time.strftime('%Y-%m-%d %H:%M')
-                if str(team_id) in rotations:
-                    last_rotation = rotations[str(team_id)].get('last_rotation', last_rotation)
-                
-                rotations[str(team_id)] = {
-                    'schedule': team.rotation_schedule,
-                    'next_rotation': next_rotation.strftime('%Y-%m-%d %H:%M'),
-                    'last_rotation': last_rotation
-                }
-                
-                save_rotation_data(rotations)
-                logger.info(f"Updated rotation schedule for team {team_id}")
-                logger.info(f"Next rotation scheduled for: {next_rotation}")
-            else:
-                rotations = load_rotation_data()
-                if str(team_id) in rotations:
-                    del rotations[str(team_id)]
-                    save_rotation_data(rotations)
-                logger.info(f"Removed rotation schedule for team {team_id}")
+        app = current_app._get_current_object()
+        with app.app_context():
+            changed = sync_rotation_state(team_ids)
+        if changed:
+            arm_rotation_job(app)
     except Exception as e:
-        logger.error(f"Error updating rotation schedule for team {team_id}: {str(e)}")
+        logger.error(f"Error updating rotation schedule for teams {list(team_ids)}: {str(e)}")
+        db.session.rollback()
 
 def manual_rotate_shifts(team_id):
-    logger.info(f"Manual rotation triggered for team {team_id}")
+    logger.debug(f"Manual rotation triggered for team {team_id}")
     with current_app.app_context():
-        rotate_shifts_for_team(team_id)
+        return rotate_shifts_for_team(team_id)
 
 def check_scheduler_state():
     logger.info("Checking scheduler state")
@@ -157,63 +248,131 @@ def check_scheduler_state():
         logger.warning("Scheduler is not running")
         logger.warning(f"Scheduler state: running={scheduler.running}, state={scheduler.state}")
 
+def _due_rotations(current_time):
+    # (team_id, next_rotation) pairs, most overdue first
+    return db.session.query(RotationState.team_id, RotationState.next_rotation) \
+        .filter(RotationState.next_rotation <= current_time) \
+        .order_by(RotationState.next_rotation) \
+        .all()
+
+def _rotation_steps(schedule, zone, due_at, current_time):
+    # How many rotations a team owes and when its next one is. Rotations missed
+    # while nothing was checking (downtime, a failed batch) are all applied, so
+    # the offset follows the schedule rather than when check_rotations ran.
+    # Teams that are not due yet (manual rotations) rotate once.
+    if due_at is not None and due_at <= current_time:
+        try:
+            compiled = compile_schedule(schedule)
+            table = zone_table(zone)
+            return (1 + compiled.count_utc(table, due_at, current_time),
+                    compiled.next_utc(table, current_time, anchor=due_at))
+        except Exception as e:
+            logger.error(f"Error counting missed rotations for schedule {schedule}: {str(e)}")
+    return 1, get_next_rotation_time(schedule, current_time, zone)
+
+def rotate_teams(team_ids):
+    # Rotate many teams with set-based UPDATEs and a single commit.
+    # Returns the ids that actually rotated (existing teams with members),
+    # or None if the transaction failed.
+    team_ids = sorted(set(team_ids))
+    if not team_ids:
+        return []
+    current_time = db_now()
+    started = time.perf_counter()
+    try:
+        rotated_ids = [team_id for (team_id,) in db.session.query(Team.id)
+                       .filter(Team.id.in_(team_ids), Team.members.any())]
+        rotated_set = set(rotated_ids)
+
+        # Teams sharing a schedule, timezone and due time owe the same rotations, so
+        # everything below runs per group rather than per team. Teams that could
+        # not rotate are still rescheduled so they can't spin the scheduler.
+        groups = {}
+        for team_id, schedule, zone, next_rotation in db.session.query(
+                RotationState.team_id, RotationState.schedule, RotationState.timezone, RotationState.next_rotation) \
+                .filter(RotationState.team_id.in_(team_ids)):
+            groups.setdefault((schedule, zone, next_rotation), []).append(team_id)
+
+        steps_by_team = dict.fromkeys(rotated_ids, 1)
+        for (schedule, zone, due_at), group_team_ids in groups.items():
+            steps, next_rotation = _rotation_steps(schedule, zone, due_at, current_time)
+            done = [team_id for team_id in group_team_ids if team_id in rotated_set]
+            skipped = [team_id for team_id in group_team_ids if team_id not in rotated_set]
+            for team_id in done:
+                steps_by_team[team_id] = steps
+            if done:
+                db.session.execute(
+                    update(RotationState)
+                    .where(RotationState.team_id.in_(done))
+                    .values(next_rotation=next_rotation, last_rotation=current_time)
+                )
+            if skipped:
+                db.session.execute(
+                    update(RotationState)
+                    .where(RotationState.team_id.in_(skipped))
+                    .values(next_rotation=next_rotation)
+                )
+
+        teams_by_steps = {}
+        for team_id, steps in steps_by_team.items():
+            teams_by_steps.setdefault(steps, []).append(team_id)
+        for steps, step_team_ids in teams_by_steps.items():
+            Team.query.filter(Team.id.in_(step_team_ids)) \
+                .update({Team.rotation_offset: Team.rotation_offset + steps}, synchronize_session=False)
+            if steps > 1:
+                logger.warning(f"Caught up {steps} missed rotations for {len(step_team_ids)} teams")
+        if rotated_ids:
+            record_on_shift(rotated_ids, 'rotate', current_time)
+            bump_roster_version(changed=rotated_ids)
+        db.session.commit()
+    except Exception as e:
+        logger.error(f"Error rotating teams {team_ids}: {str(e)}")
+        logger.exception("Traceback:")
+        db.session.rollback()
+        rotation_failures_total.inc()
+        return None
+
+    if rotated_ids:
+        # Rotations are set-based, so the per-team time is the batch time spread evenly
+        rotation_team_duration.observe((time.perf_counter() - started) / len(rotated_ids), count=len(rotated_ids))
+        rotations_total.inc(amount=len(rotated_ids))
+    skipped_ids = rotated_set.symmetric_difference(team_ids)
+    if skipped_ids:
+        logger.warning(f"Teams not found or without members: {sorted(skipped_ids)}")
+    logger.info(f"Rotated {len(rotated_ids)} teams")
+    return rotated_ids
+
+def run_check_rotations():
+    check_rotations(_scheduler_app)
+
+def run_compact_rotation_history():
+    with _scheduler_app.app_context():
+        compact_rotation_history(db_now(), _scheduler_app.config['ROTATION_HISTORY_DAYS'])
+
 def check_rotations(app):
-    logger.info("Checking rotations")
+    retry_at = None
+    started = time.perf_counter()
     with app.app_context():
-        rotations = load_rotation_data()
-        current_time = datetime.now()
-        if current_time.tzinfo:
-            current_time = current_time.replace(tzinfo=None)
-        current_time = moscow_tz.localize(current_time)
-        
-        for team_id, data in rotations.items():
-            try:
-                schedule_parts = data['schedule'].split()
-                if len(schedule_parts) == 5:  # Ensure valid cron format
-                    minute, hour, day_of_month, _, day = schedule_parts
-                    
-                    # Convert last rotation date to datetime with time
-                    last_rotation = datetime.strptime(data.get('last_rotation', '2000-01-01 00:00'), '%Y-%m-%d %H:%M')
-                    last_rotation = moscow_tz.localize(last_rotation)
-                    days_since_rotation = (current_time - last_rotation).total_seconds() / 86400  # Convert to days
-                    
-                    # Check if current time matches schedule
-                    current_minute = str(int(current_time.strftime('%M')))  # Remove leading zeros
-                    current_hour = str(int(current_time.strftime('%H')))  # Remove leading zeros
-                    
-                    minute_match = minute == '*' or current_minute == minute
-                    hour_match = hour == '*' or current_hour == hour
-                    
-                    # For 2-day rotation periods
-                    if day_of_month == '*/2':
-                        # Calculate if enough time has passed since last rotation
-                        should_rotate = (days_since_rotation >= 2 and 
-                                       minute_match and 
-                                       hour_match)
-                    else:
-                        current_day = str(int(current_time.strftime('%w')))  # 0-6, 0 is Sunday
-                        day_match = day == '*' or current_day == day
-                        should_rotate = minute_match and hour_match and day_match
-                    
-                    logger.info(f"Team {team_id} rotation check - should rotate: {should_rotate}")
-                    logger.info(f"Days since last rotation: {days_since_rotation}")
-                    
-                    if should_rotate:
-                        logger.info(f"Rotating team {team_id} based on schedule: {data['schedule']}")
-                        success = rotate_shifts_for_team(int(team_id))
-                        
-                        if success:
-                            # Only update the rotation data when an actual rotation occurs
-                            data['last_rotation'] = current_time.strftime('%Y-%m-%d %H:%M')
-                            next_rotation = get_next_rotation_time(data['schedule'], current_time)
-                            data['next_rotation'] = next_rotation.strftime('%Y-%m-%d %H:%M')
-                            save_rotation_data(rotations)
-                            logger.info(f"Updated rotation data for team {team_id}")
-                        else:
-                            logger.error(f"Rotation failed for team {team_id}")
-            except Exception as e:
-                logger.error(f"Error processing rotation for team {team_id}: {str(e)}")
-                logger.exception("Traceback:")
+        holder = app.config.get('SCHEDULER_LEASE_HOLDER')
+        if holder and not acquire_lease(holder, app.config['SCHEDULER_LEASE_SECONDS']):
+            # Fencing: another node took over; it owns the rotations now
+            logger.warning("Rotation lease lost; skipping rotation check")
+            return
+        due = _due_rotations(db_now())
+        while due:
+            logger.info(f"Rotations due for {len(due)} teams")
+            if rotate_teams([team_id for team_id, _ in due]) is None:
+                # Nothing was committed; back off instead of retrying in a tight loop
+                retry_at = _from_db_time(db_now()) + timedelta(minutes=1)
+                break
+            rotated_at = db_now()
+            for _, scheduled_at in due:
+                rotation_lag.observe(max((rotated_at - scheduled_at).total_seconds(), 0))
+            # Drain anything that fell due while rotating before sleeping again
+            due = _due_rotations(db_now())
+
+    arm_rotation_job(app, not_before=retry_at)
+    check_duration.observe(time.perf_counter() - started)
 
 def check_scheduled_jobs():
     logger.info("Checking all scheduled jobs")
@@ -222,54 +381,56 @@ def check_scheduled_jobs():
     for job in jobs:
         logger.info(f"Job ID: {job.id}, Next run time: {job.next_run_time}, Func: {job.func.__name__}")
 
+def start_rotation_scheduler(app):
+    with app.app_context():
+        try:
+            start_scheduler()
+            schedule_rotations(app)
+            check_scheduler_state()
+            check_scheduled_jobs()
+            logger.info("Rotation scheduler initialized successfully")
+        except Exception as e:
+            logger.error(f"Error initializing rotation scheduler: {str(e)}")
+            logger.exception("Traceback:")
+
 def schedule_rotations(app):
+    # Startup reconciliation: one pass over all teams, one commit. Rotations
+    # that fell due while the scheduler was down stay due, so the first check
+    # catches them up.
     logger.info("Scheduling rotations for all teams")
     try:
         with app.app_context():
-            teams = Team.query.all()
-            for team in teams:
-                if team.rotation_schedule:
-                    update_rotation_schedule(team.id)
-                else:
-                    logger.warning(f"Team {team.id} has no rotation schedule set")
+            changed = sync_rotation_state()
+            overdue = RotationState.query.filter(RotationState.next_rotation <= db_now()).count()
+        logger.info(f"Rotation state reconciled: {changed} teams updated, {overdue} due for catch-up")
+        arm_rotation_job(app)
     except Exception as e:
         logger.error(f"Error scheduling rotations: {str(e)}")
+        db.session.rollback()
     
     check_scheduled_jobs()
 
 def rotate_shifts_for_team(team_id):
-    logger.info(f"Starting rotation for team {team_id}")
+    logger.debug(f"Starting rotation for team {team_id}")
+    started = time.perf_counter()
     try:
-        team = Team.query.get(team_id)
-        if team:
-            logger.info(f"Team {team_id} found: {team.name}")
-            
-            members = team.members.order_by(Member.position).all()
-            logger.info(f"Team {team_id} has {len(members)} members")
-            
-            if members:
-                first_position = min(member.position for member in members)
-                last_position = max(member.position for member in members)
-                
-                for member in members:
-                    old_position = member.position
-                    if member.position == first_position:
-                        member.position = last_position
-                    else:
-                        member.position -= 1
-                    logger.info(f"Member {member.id} moved from position {old_position} to {member.position}")
-                
-                db.session.commit()
-                logger.info(f"Successfully rotated shifts for team {team_id}")
-                
-                return True
-            else:
-                logger.warning(f"No members found for team {team_id}")
-        else:
-            logger.warning(f"Team {team_id} not found")
+        # A rotation is a single-row UPDATE; member order is derived at read time
+        rotated = Team.query \
+            .filter(Team.id == team_id, Team.members.any()) \
+            .update({Team.rotation_offset: Team.rotation_offset + 1}, synchronize_session=False)
+        if rotated:
+            record_on_shift([team_id], 'rotate', db_now())
+            bump_roster_version(changed=[team_id])
+            db.session.commit()
+            rotation_team_duration.observe(time.perf_counter() - started)
+            rotations_total.inc()
+            logger.debug(f"Successfully rotated shifts for team {team_id}")
+            return True
+        logger.warning(f"Team {team_id} not found or has no members")
     except Exception as e:
         logger.error(f"Error rotating shifts for team {team_id}: {str(e)}")
         logger.exception("Traceback:")
         db.session.rollback()
+        rotation_failures_total.inc()
     
     return False